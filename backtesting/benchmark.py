@@ -0,0 +1,214 @@
+"""
+Time the backtesting pipeline stages on synthetic OHLCV data, best of --repeat runs plus peak memory.
+
+    python -m backtesting.benchmark --sizes 10000 100000 --output bench.json
+    python -m backtesting.benchmark --sizes 10000 100000 --compare bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import roc_ma
+from backtesting import indicators
+from backtesting.chunked import backtest_chunked
+from backtesting.data import clear_datasets, parse_bars, read_price_csv
+from capital_management.kernels import simulate_anti_martingale, simulate_fixed_size
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def synthetic_ohlcv(n_bars: int, seed: int = 0):
+    """
+    Random-walk OHLCV bars in the layout of read_price_csv: a `timestamp` index, OHLCV and a `date` column.
+    Bars are daily while they fit into the datetime64[ns] range, minutes otherwise.
+    """
+    rng = np.random.default_rng(seed)
+    freq = 'D' if n_bars <= 50_000 else 'min'
+    index = pd.date_range('1990-01-01', periods=n_bars, freq=freq, name='timestamp')
+
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars))), 2)
+    opens = np.round(close * (1 + rng.normal(0, 0.002, n_bars)), 2)
+    data = pd.DataFrame({
+        'open': opens,
+        'high': np.maximum(opens, close) + 0.1,
+        'low': np.minimum(opens, close) - 0.1,
+        'close': close,
+        'volume': rng.integers(1_000, 100_000, n_bars).astype(np.float64),
+    }, index=index)
+    data['date'] = data.index
+
+    return data
+
+
+def bar_timeframe(data):
+    """The timeframe of the synthetic bars, so the stages that aggregate bars keep every one of them."""
+    return 'D' if data.index.freqstr == 'D' else '1min'
+
+
+def write_csv(data, file_name: str):
+    """Write bars in the `datetime,open,high,low,close,volume` layout of ./resources/*.csv."""
+    data[['open', 'high', 'low', 'close', 'volume']].to_csv(file_name, index_label='datetime',
+                                                            date_format='%Y-%m-%d %H:%M:%S')
+
+
+def measure(run, setup=None, repeat: int = 3):
+    """Best wall time of run(*setup()) over repeat runs, the peak traced memory of one more run and its output."""
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        run(*args)
+        best = min(best, time.perf_counter() - start)
+
+    args = setup() if setup else ()
+    tracemalloc.start()
+    try:
+        output = run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak, output
+
+
+def _stages(data, file_name: str):
+    """(name, run, setup) for every stage, each stage gets the output of the previous one as its input."""
+    indicator = roc_ma.get_smoothed_roc_indicator(data.copy(deep=False), 21, 100)
+    signals = roc_ma.prepare_buy_sell_signals(indicator.copy())
+    actions = roc_ma.prepare_buy_sell_actions(signals, 10)
+
+    sma = indicators.sma_matrix(data['close'].to_numpy(), [20, 40])
+    crossover = np.where(sma[:, 0] > sma[:, 1], 1, np.where(sma[:, 0] < sma[:, 1], -1, 0))[40:]
+    roc = indicators.roc_matrix(data['close'].to_numpy(), [10])[10:, 0]
+    close = data['close'].to_numpy()
+    timeframe = bar_timeframe(data)
+
+    def fresh_indicator_cache():
+        indicators.cache.clear()
+        return data.copy(deep=False), 21, 100
+
+    def fresh_parse():
+        clear_datasets()
+        return file_name, None, None, timeframe
+
+    def fresh_read():
+        clear_datasets()
+        return file_name, None, None, timeframe
+
+    def backtest():
+        with contextlib.redirect_stdout(io.StringIO()):
+            roc_ma.backtest(file_name, str(data.index[0].date()), str(data.index[-1].date()), workers=1,
+                            timeframe=timeframe)
+
+    return [
+        ('parse_csv', parse_bars, lambda: (file_name,)),
+        ('parseData', roc_ma.parseData, fresh_parse),
+        ('read_price_csv', read_price_csv, fresh_read),
+        ('get_smoothed_roc_indicator', roc_ma.get_smoothed_roc_indicator, fresh_indicator_cache),
+        ('prepare_buy_sell_signals', roc_ma.prepare_buy_sell_signals, lambda: (indicator.copy(),)),
+        ('prepare_buy_sell_actions', roc_ma.prepare_buy_sell_actions, lambda: (signals, 10)),
+        ('calculate_statistics', roc_ma.calculate_statistics, lambda: (actions,)),
+        ('anti_martingale', simulate_anti_martingale, lambda: (crossover, close[40:], 1_000_000, 10_000)),
+        ('fixed_size', simulate_fixed_size, lambda: (np.sign(roc), close[10:], 1_000_000, 50)),
+        ('backtest', backtest, None),
+        ('backtest_chunked', backtest_chunked,
+         lambda: (file_name, 21, 100, 10, str(data.index[len(data) // 2].date()), None, 100_000, 2, timeframe)),
+    ]
+
+
+def run_benchmarks(sizes=SIZES, stages=None, repeat: int = 3):
+    """Run the stages (all by default) for every size and return a list of result rows."""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_bars in sizes:
+            data = synthetic_ohlcv(n_bars)
+            file_name = os.path.join(tmp, f'synthetic_{n_bars}.csv')
+            write_csv(data, file_name)
+            # parseData goes through the binary cache, convert the file before the stages are timed
+            read_price_csv(file_name)
+
+            for name, run, setup in _stages(data, file_name):
+                if stages and name not in stages:
+                    continue
+
+                seconds, peak, output = measure(run, setup, repeat)
+                # the rows a stage produced, a frame shorter than the input means its bars were aggregated
+                rows = len(output) if isinstance(output, pd.DataFrame) else n_bars
+                row = {
+                    'stage': name,
+                    'bars': n_bars,
+                    'rows': rows,
+                    'seconds': seconds,
+                    'bars_per_second': rows / seconds if seconds else float('inf'),
+                    'peak_bytes': peak,
+                }
+                print(f"{name:>28} {n_bars:>10} bars {rows:>10} rows  {seconds:10.4f} s  "
+                      f"{row['bars_per_second']:14.0f} bars/s  "
+                      f"{peak / 2 ** 20:9.1f} MiB")
+                results.append(row)
+
+    return results
+
+
+def environment():
+    """Versions and commit the results were measured with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+
+    return {
+        'commit': commit,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline):
+    """Print the speedup of every (stage, bars) found in both runs, > 1 means faster than the baseline."""
+    before = {(row['stage'], row['bars']): row for row in baseline['results']}
+    for row in results:
+        old = before.get((row['stage'], row['bars']))
+        if old:
+            print(f"{row['stage']:>28} {row['bars']:>10} bars  x{old['seconds'] / row['seconds']:7.2f} time  "
+                  f"x{old['peak_bytes'] / max(row['peak_bytes'], 1):7.2f} memory")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--stages', nargs='+', help='run only these stages')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Decimated, headless Plotly charts: series are cut down to a pixel budget before they go into a trace,
+and figures are written to files instead of opening a browser.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# about the width of a chart in pixels, there is no point in drawing more points than that
+MAX_POINTS = 2000
+
+
+def _buckets(n: int, n_buckets: int):
+    """Start index of n_buckets (almost) equal consecutive buckets over n points."""
+    return np.linspace(0, n, n_buckets + 1).astype(np.intp)[:-1]
+
+
+def minmax_indices(values, max_points: int = MAX_POINTS):
+    """
+    Indexes of the points to keep: the first, the last, the lowest and the highest point of every bucket,
+    so every spike of the series is still visible. At most max_points indexes, sorted.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= max_points:
+        return np.arange(len(values))
+
+    starts = _buckets(len(values), max(max_points // 4, 1))
+    ends = np.r_[starts[1:], len(values)]
+    bucket = np.repeat(np.arange(len(starts)), ends - starts)
+
+    # argmin/argmax per bucket: sort by (bucket, value), NaN last, and take the ends of each bucket
+    order = np.lexsort((values, bucket))
+    lowest = order[starts]
+    highest = order[np.maximum(ends - 1 - np.add.reduceat(np.isnan(values[order]), starts), starts)]
+
+    return np.unique(np.r_[starts, ends - 1, lowest, highest])
+
+
+def lttb_indices(x, y, max_points: int = MAX_POINTS):
+    """
+    Largest-Triangle-Three-Buckets: keep the first and the last point and, from every bucket in between,
+    the point forming the largest triangle with the point kept before it and the mean of the next bucket.
+    Follows the shape of the line better than min/max for the same number of points. NaN points are dropped.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= max_points or max_points < 3:
+        return valid
+
+    x, y = x[valid], y[valid]
+    starts = np.r_[_buckets(len(x) - 2, max_points - 2) + 1, len(x) - 1]
+
+    kept = np.empty(max_points, dtype=np.intp)
+    kept[0], kept[-1] = 0, len(x) - 1
+    for i in range(max_points - 2):
+        lo, hi = starts[i], starts[i + 1]
+        next_hi = starts[i + 2] if i + 2 < len(starts) else len(x)
+        next_x, next_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+
+        previous = kept[i]
+        areas = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous]) -
+                       (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        kept[i + 1] = lo + np.argmax(areas)
+
+    return valid[kept]
+
+
+def decimate_line(x, y, max_points: int = MAX_POINTS, method: str = 'lttb'):
+    """x and y cut down to max_points with `lttb` or `minmax`."""
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    if method == 'lttb':
+        # LTTB measures areas, dates are turned into numbers for it
+        index = lttb_indices(x.astype('datetime64[ns]').astype(np.int64) if x.dtype.kind == 'M' else x, y,
+                             max_points)
+    elif method == 'minmax':
+        index = minmax_indices(y, max_points)
+    else:
+        raise ValueError(f"unknown decimation method {method}, expected 'lttb' or 'minmax'")
+
+    return x[index], y[index]
+
+
+def decimate_candles(data, max_points: int = MAX_POINTS):
+    """
+    OHLC bars merged into at most max_points candles: the first open, the highest high, the lowest low and the
+    last close of every bucket of consecutive bars, dated by the first bar of the bucket.
+    """
+    if len(data) <= max_points:
+        return data[['open', 'high', 'low', 'close']]
+
+    starts = _buckets(len(data), max_points)
+    ends = np.r_[starts[1:], len(data)]
+
+    return pd.DataFrame({
+        'open': data['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(data['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(data['low'].to_numpy(), starts),
+        'close': data['close'].to_numpy()[ends - 1],
+    }, index=data.index[starts])
+
+
+def render(fig, path: str = None):
+    """
+    Write the figure to path without opening a browser: .html (plotly.js from the CDN, so the file stays small)
+    or an image format by the extension (needs kaleido). Without a path the figure is shown as before.
+    """
+    if path is None:
+        fig.show()
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if path.endswith('.html'):
+        fig.write_html(path, include_plotlyjs='cdn', auto_open=False)
+    else:
+        fig.write_image(path)
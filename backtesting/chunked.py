@@ -0,0 +1,168 @@
+import numpy as np
+
+from backtesting.data import _date_bounds, iter_chunks
+from backtesting.engine import run_lengths, trade_statistics
+from backtesting.resample import iter_resampled
+
+
+class ChunkedROC:
+    """
+    Smoothed ROC of roc_ma.get_smoothed_roc_indicator over a series fed block by block.
+    Between blocks it keeps the last roc_window closes and the last sma_window cumulative sums and counts,
+    so every block gives the values of the in-memory run to the last bit.
+    """
+
+    def __init__(self, roc_window: int, sma_window: int):
+        self.roc_window = roc_window
+        self.sma_window = sma_window
+        self._closes = np.empty(0)
+        # cumulative sums and counts of the sma_window bars before the block, zeros before the first bar
+        self._sums = np.zeros(sma_window)
+        self._counts = np.zeros(sma_window, dtype=np.int64)
+
+    def update(self, close):
+        """Smoothed ROC of the next block of closes."""
+        closes = np.r_[self._closes, close]
+        tail = len(self._closes)
+
+        roc = np.full(len(closes), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roc[self.roc_window:] = (closes[self.roc_window:] - closes[:-self.roc_window]) / \
+                                    closes[:-self.roc_window] * 100
+        roc = roc[tail:]
+        self._closes = closes[-self.roc_window:]
+
+        # continue the cumulative sums from the previous block, one sequential cumsum like the batch one
+        is_valid = ~np.isnan(roc)
+        sums = np.cumsum(np.r_[self._sums[-1], np.where(is_valid, roc, 0.0)])[1:]
+        counts = self._counts[-1] + np.cumsum(is_valid)
+
+        previous_sums = np.r_[self._sums, sums][:len(sums)]
+        previous_counts = np.r_[self._counts, counts][:len(counts)]
+        self._sums = np.r_[self._sums, sums][-self.sma_window:]
+        self._counts = np.r_[self._counts, counts][-self.sma_window:]
+
+        window_counts = counts - previous_counts
+        return np.where(window_counts == self.sma_window, (sums - previous_sums) / self.sma_window, np.nan)
+
+
+class ChunkedTrades:
+    """
+    Trade engine of roc_ma.calculate_statistics fed with actions block by block:
+    a buy opens a position, a sell closes all open positions and is ignored when nothing is open.
+    It keeps only the open buy prices, the order counts and the profit of every closing sell.
+    """
+
+    def __init__(self):
+        self.buy_orders = 0
+        self.sell_orders = 0
+        self.profits = []
+        self._open = []
+
+    def update(self, actions, prices):
+        """Feed the actions (1 buy, -1 sell, in bar order) and their prices."""
+        for action, price in zip(actions, prices):
+            if action == 1:
+                self.buy_orders += 1
+                self._open.append(price)
+            elif action == -1 and self._open:
+                profit = 0
+                for buy_price in self._open:
+                    profit += price - buy_price
+                self.sell_orders += 1
+                self.profits.append(profit)
+                self._open = []
+
+    def statistics(self):
+        return trade_statistics(self.buy_orders, self.sell_orders, self.profits)
+
+
+class ChunkedROCBacktest:
+    """
+    backtest_single_run of roc_ma.py without the chart, fed block by block.
+    Bars before start_date only warm the indicators up. The run of equal signals still open at the end of
+    a block is carried over: its action is decided once the run ends, by its full length.
+    """
+
+    def __init__(self, roc_window: int, sma_window: int, exit: int, start_date=None, entry: int = 2):
+        self.indicator = ChunkedROC(roc_window, sma_window)
+        self.trades = ChunkedTrades()
+        self.exit = exit
+        self.entry = entry
+        self.start, _ = _date_bounds(start_date, None)
+        # the open run: signal, length and the close of its first bar
+        self._run = None
+
+    def _actions(self, lengths, signals):
+        return np.where((signals == 1) & (lengths > self.entry), 1,
+                        np.where((signals == -1) & (lengths > self.exit), -1, 0))
+
+    def update(self, chunk):
+        """Feed the next block of bars, a frame with a `close` column indexed by timestamp."""
+        close = chunk['close'].to_numpy(dtype=np.float64)
+        smoothed_roc = self.indicator.update(close)
+
+        if self.start is not None:
+            trading = chunk.index.to_numpy() >= self.start.to_datetime64()
+            close, smoothed_roc = close[trading], smoothed_roc[trading]
+        if not len(close):
+            return
+
+        signal = np.where(smoothed_roc > 0, 1, np.where(smoothed_roc < 0, -1, 0))
+        starts, lengths, signals = run_lengths(signal)
+        prices = close[starts]
+
+        # the first run continues the open one when the signal didn't change at the boundary
+        if self._run is not None:
+            run_signal, run_length, run_price = self._run
+            if run_signal == signals[0]:
+                lengths[0] += run_length
+                prices[0] = run_price
+            else:
+                self._close_run()
+
+        # the last run may go on in the next block
+        self._run = (signals[-1], lengths[-1], prices[-1])
+
+        actions = self._actions(lengths[:-1], signals[:-1])
+        self.trades.update(actions[actions != 0], prices[:-1][actions != 0])
+
+    def _close_run(self):
+        run_signal, run_length, run_price = self._run
+        action = self._actions(np.array([run_length]), np.array([run_signal]))
+        self.trades.update(action, [run_price])
+        self._run = None
+
+    def statistics(self):
+        """Close the open run and return the stats dict of calculate_statistics."""
+        if self._run is not None:
+            self._close_run()
+
+        return self.trades.statistics()
+
+
+def backtest_chunked(file_name: str, roc_window: int, sma_window: int, exit: int, start_date: str,
+                     end_date: str, chunksize: int = 100_000, entry: int = 2, timeframe: str = 'D'):
+    """
+    Stats of backtest_single_run streamed from the file in blocks of chunksize bars:
+    memory is bounded by the block size, not by the length of the history.
+    The bars are aggregated to the timeframe block by block like parseData does (timeframe=None runs on the
+    raw bars). As in parseData, end_date applies to the aggregated periods, not to the raw bars.
+    """
+    backtest = ChunkedROCBacktest(roc_window, sma_window, exit, start_date, entry)
+
+    chunks = iter_chunks(file_name, end_date=end_date if timeframe is None else None, chunksize=chunksize)
+    if timeframe is not None:
+        chunks = iter_resampled(chunks, timeframe)
+
+    _, end = _date_bounds(None, end_date)
+    for chunk in chunks:
+        is_last = end is not None and chunk.index[-1] > end
+        if is_last:
+            chunk = chunk[chunk.index <= end]
+        if len(chunk):
+            backtest.update(chunk)
+        if is_last:
+            break
+
+    return backtest.statistics()
@@ -0,0 +1,278 @@
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtesting.profiling import stage
+from backtesting.resample import resample_bars
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# supported file layouts: date column, date format and read_csv options
+FORMATS = {
+    # ./resources/LKOH.csv: datetime,open,high,low,close,volume
+    'datetime': ('datetime', 'ISO8601', {}),
+    # ../resources/GMKN.csv: ...,timestamp,...,open,high,low,close,volume with comma decimals
+    'timestamp': ('timestamp', '%y%m%d', {'decimal': ','}),
+}
+
+# binary copies of the CSV files are kept in this directory next to the source file
+CACHE_DIR = '.cache'
+
+# bumped when the parsing changes, caches written by another version are rebuilt
+CACHE_VERSION = 2
+
+# parsed datasets, keyed by (absolute file path, start_date, end_date, timeframe): (mtime, DataFrame)
+_datasets = {}
+
+# bars of whole files aggregated to a timeframe, keyed by (absolute file path, timeframe): (mtime_ns, DataFrame)
+_resampled = {}
+
+
+def detect_format(file_name: str):
+    """Return the FORMATS key matching the header of the file."""
+    with open(file_name, 'r') as f:
+        header = next(csv.reader(f))
+
+    for name, (date_column, _, _) in FORMATS.items():
+        if date_column in header:
+            return name
+
+    raise ValueError(f"{file_name}: expected a 'datetime' or 'timestamp' column, got {header}")
+
+
+def _date_bounds(start_date, end_date):
+    """Turn start/end dates into inclusive timestamps, end_date='2024-08-31' covers the whole day like .loc does."""
+    start = pd.Period(start_date).start_time if isinstance(start_date, str) else start_date
+    end = pd.Period(end_date).end_time if isinstance(end_date, str) else end_date
+
+    return (pd.Timestamp(start) if start is not None else None,
+            pd.Timestamp(end) if end is not None else None)
+
+
+def iter_chunks(file_name: str, start_date=None, end_date=None, chunksize: int = 250_000):
+    """
+    Parse OHLCV bars from the CSV file block by block, yielding DataFrames of at most chunksize rows
+    indexed by a datetime64[ns] `timestamp`, prices and volume as float64.
+    Dates are parsed in bulk per chunk, and rows outside [start_date, end_date] are dropped chunk by chunk,
+    so they are never collected. Files are expected to be sorted by date, reading stops after end_date.
+    """
+    date_column, date_format, options = FORMATS[detect_format(file_name)]
+    start, end = _date_bounds(start_date, end_date)
+
+    # round_trip parses every number like float() does, the default fast parser is off by 1 ULP on some values
+    reader = pd.read_csv(
+        file_name,
+        usecols=[date_column] + PRICE_COLUMNS,
+        dtype={date_column: str},
+        chunksize=chunksize,
+        float_precision='round_trip',
+        **options
+    )
+
+    # the reader is closed even when the caller stops before the end of the file
+    with reader:
+        for chunk in reader:
+            timestamps = pd.to_datetime(chunk[date_column], format=date_format).to_numpy('datetime64[ns]')
+
+            mask = np.ones(len(chunk), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start.to_datetime64()
+            if end is not None:
+                mask &= timestamps <= end.to_datetime64()
+
+            if mask.any():
+                columns = {col: chunk[col].to_numpy()[mask].astype(np.float64) for col in PRICE_COLUMNS}
+                yield pd.DataFrame(columns, index=pd.DatetimeIndex(timestamps[mask], name='timestamp'))
+
+            if end is not None and len(timestamps) and timestamps[-1] > end.to_datetime64():
+                break
+
+
+@stage()
+def parse_bars(file_name: str, start_date=None, end_date=None, chunksize: int = 250_000):
+    """Parse OHLCV bars from the CSV file into one DataFrame, see iter_chunks."""
+    chunks = list(iter_chunks(file_name, start_date, end_date, chunksize))
+
+    if not chunks:
+        return pd.DataFrame({col: np.empty(0, dtype=np.float64) for col in PRICE_COLUMNS},
+                            index=pd.DatetimeIndex([], dtype='datetime64[ns]', name='timestamp'))
+
+    return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+
+def _file_hash(path: str):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+
+def _cache_paths(path: str):
+    directory = os.path.join(os.path.dirname(path), CACHE_DIR)
+    base = os.path.join(directory, os.path.basename(path))
+
+    return directory, base + '.json', base + '.timestamp.npy', base + '.prices.npy'
+
+
+def _write_cache(path: str, stat, sha1: str):
+    """Convert the whole CSV file into .npy columns: timestamps (n,) and prices (5, n), one row per column."""
+    directory, meta_path, timestamp_path, prices_path = _cache_paths(path)
+    os.makedirs(directory, exist_ok=True)
+
+    bars = parse_bars(path)
+    _save_npy(timestamp_path, bars.index.to_numpy('datetime64[ns]'))
+    _save_npy(prices_path, np.ascontiguousarray(bars[PRICE_COLUMNS].to_numpy(np.float64).T))
+
+    # the metadata is written last, so an interrupted conversion is never picked up as valid
+    _write_meta(meta_path, stat, sha1, len(bars))
+
+
+def _save_npy(npy_path: str, values):
+    """
+    Save into a temporary file and move it into place: frames still mapping the previous file keep its inode,
+    truncating it in place would change their values or crash the process on access.
+    """
+    with open(npy_path + '.tmp', 'wb') as f:
+        np.save(f, values)
+    os.replace(npy_path + '.tmp', npy_path)
+
+
+def _write_meta(meta_path: str, stat, sha1: str, rows: int):
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': sha1,
+                   'rows': rows}, f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def _is_cache_valid(path: str, stat, meta_path: str):
+    """The cache is valid if the CSV mtime is unchanged, or if its content hash is (e.g. the file was touched)."""
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False, None
+
+    if meta.get('version') != CACHE_VERSION:
+        return False, None
+
+    if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+        return True, meta['sha1']
+
+    sha1 = _file_hash(path)
+    if meta['size'] == stat.st_size and meta['sha1'] == sha1:
+        _write_meta(meta_path, stat, sha1, meta['rows'])
+        return True, sha1
+
+    return False, sha1
+
+
+def file_hash(file_name: str):
+    """SHA-1 of the file content, taken from the binary cache metadata while the file is unchanged."""
+    path = os.path.abspath(file_name)
+    _, sha1 = _is_cache_valid(path, os.stat(path), _cache_paths(path)[1])
+
+    return sha1 or _file_hash(path)
+
+
+@stage()
+def read_bars(file_name: str, start_date=None, end_date=None, cache: bool = True):
+    """
+    Read OHLCV bars into a DataFrame indexed by a datetime64[ns] `timestamp`, prices and volume as float64.
+    On the first read the CSV is converted into memory-mapped .npy files in CACHE_DIR next to it;
+    later reads map those files and return a zero-copy, read-only view of the [start_date, end_date] window.
+    The cache is rebuilt when the CSV changes. With cache=False, or when the directory is not writable,
+    the CSV is parsed directly.
+    """
+    if not cache:
+        return parse_bars(file_name, start_date, end_date)
+
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    _, meta_path, timestamp_path, prices_path = _cache_paths(path)
+
+    is_valid, sha1 = _is_cache_valid(path, stat, meta_path)
+    if not is_valid:
+        try:
+            _write_cache(path, stat, sha1 or _file_hash(path))
+        except OSError:
+            return parse_bars(file_name, start_date, end_date)
+
+    timestamps = np.load(timestamp_path, mmap_mode='r')
+    prices = np.load(prices_path, mmap_mode='r')
+
+    start, end = _date_bounds(start_date, end_date)
+    lo = 0 if start is None else np.searchsorted(timestamps, start.to_datetime64(), side='left')
+    hi = len(timestamps) if end is None else np.searchsorted(timestamps, end.to_datetime64(), side='right')
+
+    return pd.DataFrame(
+        prices[:, lo:hi].T,
+        index=pd.DatetimeIndex(timestamps[lo:hi], name='timestamp'),
+        columns=PRICE_COLUMNS,
+        copy=False
+    )
+
+
+def read_resampled(file_name: str, timeframe: str = 'D', start_date=None, end_date=None):
+    """
+    Bars of the file aggregated to the timeframe (see backtesting.resample), on the [start_date, end_date] periods.
+    The whole file is aggregated once per timeframe and kept in memory until the file changes,
+    so strategies run on several timeframes never aggregate the raw bars twice.
+    """
+    path = os.path.abspath(file_name)
+    mtime = os.stat(path).st_mtime_ns
+    key = (path, timeframe)
+
+    cached = _resampled.get(key)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, resample_bars(read_bars(path), timeframe))
+        _resampled[key] = cached
+
+    start, end = _date_bounds(start_date, end_date)
+
+    # a shallow copy: the caller may add columns, the cached frame keeps its own
+    return cached[1].loc[start:end].copy(deep=False)
+
+
+def read_price_csv(file_name: str, start_date=None, end_date=None, timeframe: str = 'D'):
+    """
+    Read bars the way the ROC scripts expect them: daily (intraday bars aggregated per day, not just dated)
+    or on another timeframe, with a `date` column.
+    """
+    data = read_resampled(file_name, timeframe, start_date, end_date)
+    data['date'] = data.index
+
+    return data
+
+
+def load_dataset(file_name: str, start_date=None, end_date=None, timeframe: str = 'D'):
+    """
+    Parse a ticker file once and keep it in memory.
+    Every call returns a shallow copy of the parsed frame: columns added by the caller stay local to the copy,
+    while the price columns are shared with the cached dataset and never re-read from disk.
+    The cached frame is re-parsed only when the file modification time changes.
+    """
+    path = os.path.abspath(file_name)
+    mtime = os.path.getmtime(path)
+    key = (path, start_date, end_date, timeframe)
+
+    cached = _datasets.get(key)
+    if cached is None or cached[0] != mtime:
+        data = read_price_csv(path, start_date, end_date, timeframe)
+        # identifies the dataset for the indicator cache
+        data.attrs['source'] = (path, mtime, start_date, end_date, timeframe)
+        cached = (mtime, data)
+        _datasets[key] = cached
+
+    return cached[1].copy(deep=False)
+
+
+def clear_datasets():
+    """Drop the datasets kept in memory by load_dataset and read_resampled."""
+    _datasets.clear()
+    _resampled.clear()
@@ -0,0 +1,112 @@
+import numpy as np
+
+from backtesting import metrics
+from backtesting.tradelog import TradeLog
+
+
+def run_lengths(values):
+    """Run-length encode a 1-D array: the start index, the length and the value of every run of equal values."""
+    values = np.asarray(values)
+
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]]) if len(values) else np.empty(0, dtype=np.intp)
+    lengths = np.diff(np.r_[starts, len(values)])
+
+    return starts, lengths, values[starts]
+
+
+def _segment_sums(values, segments):
+    """
+    Sum values per segment (segments is sorted, one id per value) strictly left to right,
+    so every sum matches a plain `profit += value` loop to the last bit.
+    """
+    starts = np.flatnonzero(np.r_[True, segments[1:] != segments[:-1]])
+    lengths = np.diff(np.r_[starts, len(values)])
+
+    # lay the segments out as rows padded with zeros, cumsum is sequential along a row
+    rows = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(len(values)) - np.repeat(starts, lengths)
+    table = np.zeros((len(starts), lengths.max(initial=0)))
+    table[rows, offsets] = values
+
+    return np.cumsum(table, axis=1)[:, -1] if table.size else np.empty(0)
+
+
+def match_trade_log(buys, sells, prices):
+    """
+    Match buy and sell actions, given as boolean masks over the bars, in one pass over arrays.
+    Every buy opens a position at its price; a sell closes all open positions at its price,
+    and is ignored when nothing is open. Buys after the last such sell stay open.
+    Returns a TradeLog with one long trade of size 1 per buy, pnl is the price difference.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+
+    buy_index = np.flatnonzero(buys)
+    sell_index = np.flatnonzero(sells)
+
+    # the position state only changes on a sell with at least one buy since the previous sell
+    buys_before_sell = np.searchsorted(buy_index, sell_index)
+    closes_position = buys_before_sell > np.r_[0, buys_before_sell[:-1]]
+    sell_index = sell_index[closes_position]
+
+    # every buy is closed by the first closing sell after it
+    closing_sell = np.searchsorted(sell_index, buy_index)
+    is_closed = closing_sell < len(sell_index)
+
+    exit_index = np.full(len(buy_index), -1, dtype=np.int64)
+    exit_index[is_closed] = sell_index[closing_sell[is_closed]]
+    entry_price = prices[buy_index]
+    exit_price = np.where(is_closed, prices[exit_index], np.nan)
+
+    pnl = exit_price - entry_price
+
+    return TradeLog.from_arrays(entry_index=buy_index, exit_index=exit_index, entry_price=entry_price,
+                                exit_price=exit_price, pnl=pnl, **{'return': pnl / entry_price})
+
+
+def sell_profits(log):
+    """The closing sells of a match_trade_log log and the profit of each of them, summed over the buys it closes."""
+    closed = log.closed()
+
+    # every closing sell closes at least one buy, the closed trades come in the order of their sells
+    return np.unique(closed['exit_index']), _segment_sums(closed['pnl'], closed['exit_index'])
+
+
+def match_trades(buys, sells, prices):
+    """
+    match_trade_log summed per closing sell.
+    Returns the row indexes of all buys, the row indexes of the closing sells and the profit of each closing sell.
+    """
+    log = match_trade_log(buys, sells, prices)
+
+    return (log['entry_index'],) + sell_profits(log)
+
+
+def trade_statistics(buy_orders: int, sell_orders: int, profits):
+    """
+    The stats dict of roc_ma.calculate_statistics from the number of orders and the profit of every closing sell.
+    Like the original loop, it raises ZeroDivisionError when no position was ever closed.
+    """
+    profits = np.asarray(profits, dtype=np.float64)
+
+    # the running total is accumulated in trade order, as a sequential cumsum
+    total_profit = float(np.cumsum(profits)[-1]) if len(profits) else 0
+
+    wins = int(np.count_nonzero(profits > 0))
+    losses = len(profits) - wins
+
+    win_rate = float(metrics.win_rate(profits)) * 100
+    average_profit = total_profit / len(profits)
+
+    win_loss_ration = wins / losses if losses else 0
+
+    return {
+        'total_profit': total_profit,
+        'total_trades': buy_orders + sell_orders,
+        'win_rate': win_rate,
+        'win_loss_ratio': format(win_loss_ration, ".2f"),
+        'average_profit': average_profit,
+        'wins': wins,
+        'losses': losses,
+        'buy_orders': buy_orders,
+        'sell_orders': sell_orders,
+    }
@@ -0,0 +1,237 @@
+"""
+Asyncio bar feed: a local server replays ticker CSV files over TCP at a given rate, a client feeds the bars
+to the live strategies of backtesting.streaming and measures the bar-to-signal latency.
+
+    python -m backtesting.feed --sources ./resources --rate 1000 --copies 1 10 100
+
+One bar per line: symbol,timestamp (ns),open,high,low,close,volume,sent (ns, wall clock of the server).
+The server waits for the socket to drain after every write and the client keeps at most queue_size batches
+in memory, so a slow consumer slows the replay down instead of piling bars up.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backtesting.data import PRICE_COLUMNS, read_resampled
+from backtesting.streaming import SMACrossoverStrategy, StreamingROCStrategy
+from backtesting.universe import ticker_files
+
+# the strategies a symbol is fed to by default, name: factory
+STRATEGIES = {
+    'roc': lambda: StreamingROCStrategy(roc_window=21, sma_window=100, exit=10),
+    'sma_crossover': lambda: SMACrossoverStrategy(fast=20, slow=40),
+}
+
+# at most this many bars per write of the server
+SEND_BATCH = 1024
+
+READ_SIZE = 2 ** 16
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+def replay_lines(sources, start_date=None, end_date=None, copies: int = 1, timeframe: str = 'D'):
+    """
+    The bars of every ticker file on the timeframe (as parseData and replay_csv read them) merged in timestamp order,
+    as encoded lines without the sent time.
+    copies > 1 replays every file under several symbols (LKOH_0, LKOH_1, ...) to load-test more symbols.
+    """
+    timestamps, lines = [], []
+    for file_name in ticker_files(sources):
+        bars = read_resampled(file_name, timeframe, start_date, end_date)
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        # repr keeps every float exact through the text
+        rows = [','.join([str(timestamp)] + [repr(value) for value in values])
+                for timestamp, values in zip(bars.index.asi8, bars[PRICE_COLUMNS].to_numpy().tolist())]
+
+        for copy in range(copies):
+            symbol = f'{name}_{copy}' if copies > 1 else name
+            timestamps.append(bars.index.asi8)
+            lines.extend(f'{symbol},{row},'.encode() for row in rows)
+
+    order = np.argsort(np.concatenate(timestamps), kind='stable') if timestamps else []
+
+    return [lines[i] for i in order]
+
+
+async def _replay(writer, lines, rate: float = None):
+    """Write the lines, rate bars per second in total (as fast as the client reads without a rate)."""
+    start = time.perf_counter()
+    sent = 0
+    try:
+        while sent < len(lines):
+            due = len(lines)
+            if rate:
+                elapsed = time.perf_counter() - start
+                due = min(int(elapsed * rate) + 1, len(lines))
+                if due <= sent:
+                    await asyncio.sleep((sent + 1) / rate - elapsed)
+                    continue
+
+            due = min(due, sent + SEND_BATCH)
+            stamp = b'%d\n' % time.time_ns()
+            writer.write(stamp.join(lines[sent:due]) + stamp)
+            await writer.drain()
+            sent = due
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_replay_server(sources, host: str = '127.0.0.1', port: int = 0, rate: float = None,
+                              start_date=None, end_date=None, copies: int = 1, timeframe: str = 'D'):
+    """
+    Serve the bars of the ticker files: every client gets the whole replay from the first bar, then EOF.
+    rate is in bars per second per symbol, None replays as fast as the client keeps up.
+    port 0 picks a free port, see server.sockets[0].getsockname().
+    """
+    lines = replay_lines(sources, start_date, end_date, copies, timeframe)
+    n_symbols = len({line.split(b',', 1)[0] for line in lines})
+    total_rate = rate * n_symbols if rate else None
+
+    async def handle(reader, writer):
+        await _replay(writer, lines, total_rate)
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def _read_batches(reader, queue):
+    """Split the stream into batches of lines, waiting while the queue is full, None at the end of the feed."""
+    rest = b''
+    while chunk := await reader.read(READ_SIZE):
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        if lines:
+            await queue.put(lines)
+
+    await queue.put(None)
+
+
+def _parse(lines):
+    """Symbols, timestamps, closes and sent times of a batch of lines."""
+    fields = [line.split(b',') for line in lines]
+    symbols = [row[0].decode() for row in fields]
+    timestamps = pd.DatetimeIndex(np.array([int(row[1]) for row in fields], dtype='datetime64[ns]'))
+    closes = [float(row[5]) for row in fields]
+    sent = [int(row[7]) for row in fields]
+
+    return symbols, timestamps, closes, sent
+
+
+async def consume_feed(host: str, port: int, strategies=None, queue_size: int = 64, max_batch: int = 4096):
+    """
+    Feed the bars of the server to the strategies (STRATEGIES by default), one instance per symbol.
+    Bars are handled in batches of what has arrived, at most max_batch bars. The latency of a bar runs from
+    the server writing it to every strategy having seen it.
+    Returns the events (symbol, strategy, timestamp, close, action) and the latencies in nanoseconds.
+    """
+    strategies = strategies or STRATEGIES
+    reader, writer = await asyncio.open_connection(host, port)
+    queue = asyncio.Queue(maxsize=queue_size)
+    reading = asyncio.create_task(_read_batches(reader, queue))
+
+    running = {}
+    events, latencies = [], []
+    done = False
+    try:
+        while not done:
+            batch = await queue.get()
+            # take whatever else is already waiting, up to max_batch bars
+            while batch is not None and len(batch) < max_batch and not queue.empty():
+                more = queue.get_nowait()
+                if more is None:
+                    done = True
+                    break
+                batch.extend(more)
+            if batch is None:
+                break
+
+            for symbol, timestamp, close, sent in zip(*_parse(batch)):
+                if symbol not in running:
+                    running[symbol] = {name: factory() for name, factory in strategies.items()}
+
+                for name, strategy in running[symbol].items():
+                    event = strategy.update(timestamp, close)
+                    if event is not None:
+                        events.append((symbol, name) + event)
+                latencies.append(time.time_ns() - sent)
+
+            # let the reader refill the queue between batches
+            await asyncio.sleep(0)
+        await reading
+    finally:
+        reading.cancel()
+        writer.close()
+
+    events = pd.DataFrame(events, columns=['symbol', 'strategy', 'timestamp', 'close', 'action'])
+
+    return events, np.array(latencies, dtype=np.int64)
+
+
+def latency_summary(latencies, seconds: float):
+    """Bars, throughput and the latency percentiles in milliseconds."""
+    summary = {'bars': len(latencies), 'seconds': seconds,
+               'bars_per_second': len(latencies) / seconds if seconds else float('inf')}
+    values = np.percentile(latencies, PERCENTILES) / 1e6 if len(latencies) else [np.nan] * len(PERCENTILES)
+    summary.update({f'p{percentile}_ms': float(value) for percentile, value in zip(PERCENTILES, values)})
+    summary['max_ms'] = float(latencies.max()) / 1e6 if len(latencies) else np.nan
+
+    return summary
+
+
+async def replay(sources, rate: float = None, copies: int = 1, strategies=None, start_date=None, end_date=None,
+                 timeframe: str = 'D'):
+    """Replay the ticker files through a local server into consume_feed, returns the events and latency_summary."""
+    server = await start_replay_server(sources, rate=rate, start_date=start_date, end_date=end_date, copies=copies,
+                                       timeframe=timeframe)
+    host, port = server.sockets[0].getsockname()[:2]
+    try:
+        start = time.perf_counter()
+        events, latencies = await consume_feed(host, port, strategies)
+        seconds = time.perf_counter() - start
+    finally:
+        server.close()
+        await server.wait_closed()
+
+    return events, latency_summary(latencies, seconds)
+
+
+def load_test(sources, copies=(1, 10, 100), rate: float = None, start_date=None, end_date=None,
+              timeframe: str = 'D'):
+    """
+    Replay the ticker files for growing numbers of symbols, one row per run.
+    With a rate, a process keeps up with the symbols while bars_per_second stays at rate x symbols
+    and the latency stays flat.
+    """
+    rows = []
+    for n in copies:
+        _, summary = asyncio.run(replay(sources, rate, n, start_date=start_date, end_date=end_date,
+                                        timeframe=timeframe))
+        rows.append({'symbols': n * len(ticker_files(sources)), **summary})
+        print(f"{rows[-1]['symbols']:>6} symbols  {summary['bars_per_second']:12.0f} bars/s  "
+              f"p50 {summary['p50_ms']:9.3f} ms  p99 {summary['p99_ms']:9.3f} ms")
+
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', default='./resources', help='ticker CSV file or directory')
+    parser.add_argument('--rate', type=float, help='bars per second per symbol, as fast as possible if not given')
+    parser.add_argument('--copies', type=int, nargs='+', default=[1], help='replay every file under N symbols')
+    parser.add_argument('--start-date')
+    parser.add_argument('--end-date')
+    parser.add_argument('--timeframe', default='D', help='bars are aggregated to it first, as in parseData')
+    args = parser.parse_args()
+
+    print(load_test(args.sources, args.copies, args.rate, args.start_date, args.end_date,
+                    args.timeframe).to_string())
+
+
+if __name__ == '__main__':
+    main()
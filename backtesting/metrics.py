@@ -0,0 +1,139 @@
+"""
+Performance metrics over equity curves, per-bar returns or per-trade profits.
+Every function takes a 1-D array for one run or a 2-D array with one run per row and returns a number or
+an array with one value per run. Runs shorter than others are padded with NaN at the end, which is ignored:
+the curve ends at its last non-NaN point and padded bars count neither in durations nor in exposure.
+"""
+import numpy as np
+import pandas as pd
+
+# daily bars
+PERIODS_PER_YEAR = 252
+
+
+def returns(equity):
+    """Simple returns between consecutive points of the equity curve."""
+    equity = np.asarray(equity, dtype=np.float64)
+    return equity[..., 1:] / equity[..., :-1] - 1
+
+
+def _last(values):
+    """The last non-NaN value of every run."""
+    is_valid = ~np.isnan(values)
+    last = values.shape[-1] - 1 - np.argmax(is_valid[..., ::-1], axis=-1)
+
+    return np.take_along_axis(values, np.expand_dims(last, -1), axis=-1)[..., 0]
+
+
+def total_return(equity):
+    equity = np.asarray(equity, dtype=np.float64)
+    return _last(equity) / equity[..., 0] - 1
+
+
+def cagr(equity, periods_per_year: float = PERIODS_PER_YEAR):
+    """Compound annual growth rate of an equity curve sampled periods_per_year times a year."""
+    equity = np.asarray(equity, dtype=np.float64)
+    years = (np.count_nonzero(~np.isnan(equity), axis=-1) - 1) / periods_per_year
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (_last(equity) / equity[..., 0]) ** (1 / years) - 1
+
+
+def sharpe(period_returns, periods_per_year: float = PERIODS_PER_YEAR, risk_free: float = 0.0):
+    """
+    Annualized Sharpe ratio: mean excess return over its (population) standard deviation.
+    With periods_per_year=1 it is the per-trade ratio of anti_martingale.py.
+    """
+    excess = np.asarray(period_returns, dtype=np.float64) - risk_free
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nanmean(excess, axis=-1) / np.nanstd(excess, axis=-1) * np.sqrt(periods_per_year)
+
+
+def sortino(period_returns, periods_per_year: float = PERIODS_PER_YEAR, risk_free: float = 0.0):
+    """Annualized Sortino ratio: mean excess return over the downside deviation (losses only, zero target)."""
+    excess = np.asarray(period_returns, dtype=np.float64) - risk_free
+    downside = np.sqrt(np.nanmean(np.minimum(excess, 0) ** 2, axis=-1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nanmean(excess, axis=-1) / downside * np.sqrt(periods_per_year)
+
+
+def drawdowns(equity):
+    """Drop from the running peak at every point, as a fraction of the peak."""
+    equity = np.asarray(equity, dtype=np.float64)
+    peaks = np.fmax.accumulate(equity, axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (peaks - equity) / peaks
+
+
+def max_drawdown(equity):
+    """Largest drop from a running peak, as a fraction of the peak."""
+    return np.nanmax(drawdowns(equity), axis=-1)
+
+
+def max_drawdown_duration(equity):
+    """Longest stretch, in points of the curve, spent below a previous peak (until recovered or the end)."""
+    equity = np.asarray(equity, dtype=np.float64)
+    is_valid = ~np.isnan(equity)
+    # position of every point among the non-NaN points of its run
+    points = np.cumsum(is_valid, axis=-1) - 1
+
+    at_peak = equity >= np.fmax.accumulate(equity, axis=-1)
+    last_peak = np.maximum.accumulate(np.where(at_peak, points, 0), axis=-1)
+
+    return np.where(is_valid, points - last_peak, 0).max(axis=-1)
+
+
+def win_rate(profits):
+    """Share of trades with a positive profit."""
+    profits = np.asarray(profits, dtype=np.float64)
+    trades = np.count_nonzero(~np.isnan(profits), axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.count_nonzero(profits > 0, axis=-1) / trades
+
+
+def profit_factor(profits):
+    """Gross profit over gross loss, inf without a losing trade."""
+    profits = np.asarray(profits, dtype=np.float64)
+    gains = np.nansum(np.where(profits > 0, profits, 0), axis=-1)
+    losses = -np.nansum(np.where(profits < 0, profits, 0), axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(losses > 0, gains / losses, np.where(gains > 0, np.inf, np.nan))
+
+
+def exposure(positions):
+    """Share of bars with an open position (any non-zero position)."""
+    positions = np.asarray(positions, dtype=np.float64)
+    is_valid = ~np.isnan(positions)
+
+    return np.count_nonzero(is_valid & (positions != 0), axis=-1) / np.count_nonzero(is_valid, axis=-1)
+
+
+def performance(equity, profits=None, positions=None, periods_per_year: float = PERIODS_PER_YEAR):
+    """
+    All the metrics of one run as a dict, or of many runs (2-D input) as a frame with one row per run.
+    The trade metrics need the per-trade profits, exposure needs the positions per bar.
+    """
+    period_returns = returns(equity)
+    metrics = {
+        'total_return': total_return(equity),
+        'cagr': cagr(equity, periods_per_year),
+        'sharpe': sharpe(period_returns, periods_per_year),
+        'sortino': sortino(period_returns, periods_per_year),
+        'max_drawdown': max_drawdown(equity),
+        'max_drawdown_duration': max_drawdown_duration(equity),
+    }
+    if profits is not None:
+        metrics['win_rate'] = win_rate(profits)
+        metrics['profit_factor'] = profit_factor(profits)
+    if positions is not None:
+        metrics['exposure'] = exposure(positions)
+
+    if np.ndim(equity) == 1:
+        return {name: value.item() for name, value in metrics.items()}
+
+    return pd.DataFrame(metrics)
@@ -0,0 +1,253 @@
+"""
+Parameter search for the strategies: every optimizer maximizes objective(params, fidelity) over a space of
+discrete values, within a budget of evaluations and/or seconds, and returns the trials it ran.
+
+fidelity is the share of the data (0 to 1] an evaluation may use, only successive halving asks for less than 1.
+"""
+import itertools
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+import roc_ma
+
+# the dimensions of the ROC strategy
+ROC_SPACE = {
+    'roc_window': list(range(10, 31)),
+    'sma_window': [50, 100, 150, 200, 250],
+    'exit': [5, 10, 15, 20],
+    'entry': [1, 2, 3, 4, 5],
+}
+
+
+class Budget:
+    """Stops a search after max_evals evaluations or max_seconds seconds, whichever comes first."""
+
+    def __init__(self, max_evals: int = None, max_seconds: float = None):
+        self.max_evals = max_evals
+        self.max_seconds = max_seconds
+        self.evals = 0
+        self._start = time.perf_counter()
+
+    def exhausted(self):
+        if self.max_evals is not None and self.evals >= self.max_evals:
+            return True
+
+        return self.max_seconds is not None and time.perf_counter() - self._start >= self.max_seconds
+
+
+def _evaluate(objective, params: dict, trials: list, budget: Budget, fidelity: float = 1.0):
+    score = objective(params, fidelity)
+    budget.evals += 1
+    trials.append({**params, 'fidelity': fidelity, 'score': score})
+
+    return score
+
+
+def _sample(space: dict, rng):
+    return {name: values[rng.integers(len(values))] for name, values in space.items()}
+
+
+def grid_search(objective, space: dict, budget: Budget, seed: int = 0):
+    """Every combination of the space in order, like the loops of roc_ma.backtest."""
+    trials = []
+    for combination in itertools.product(*space.values()):
+        if budget.exhausted():
+            break
+        _evaluate(objective, dict(zip(space, combination)), trials, budget)
+
+    return trials
+
+
+def random_search(objective, space: dict, budget: Budget, seed: int = 0):
+    """Distinct combinations drawn uniformly, until the budget or the space runs out."""
+    rng = np.random.default_rng(seed)
+    size = math.prod(len(values) for values in space.values())
+
+    trials, seen = [], set()
+    while not budget.exhausted() and len(seen) < size:
+        params = _sample(space, rng)
+        key = tuple(params.values())
+        if key not in seen:
+            seen.add(key)
+            _evaluate(objective, params, trials, budget)
+
+    return trials
+
+
+def _halving_sizes(n_candidates: int, eta: int):
+    """Number of candidates of every round of successive halving, down to the single one of the last round."""
+    sizes = [n_candidates]
+    while sizes[-1] > 1:
+        sizes.append(max(1, sizes[-1] // eta))
+
+    return sizes
+
+
+def successive_halving(objective, space: dict, budget: Budget, seed: int = 0, n_candidates: int = None,
+                       eta: int = 3):
+    """
+    Draw n_candidates, evaluate them all on a short date range, keep the best 1/eta of them and evaluate those on
+    an eta times longer range, until the survivors are evaluated on the whole data.
+    Most candidates are dropped after a cheap evaluation, only a few are evaluated on the whole data.
+    By default n_candidates is the most whose rounds fit into budget.max_evals (81 without it), so the last round
+    runs on the whole data. If a time budget runs out first, the best candidate so far is still evaluated on the
+    whole data, one evaluation over the time.
+    """
+    size = math.prod(len(values) for values in space.values())
+    if n_candidates is None:
+        n_candidates = 81
+        if budget.max_evals is not None:
+            n_candidates = 1
+            while n_candidates < size and sum(_halving_sizes(n_candidates + 1, eta)) <= budget.max_evals:
+                n_candidates += 1
+
+    rng = np.random.default_rng(seed)
+    candidates = list({tuple(_sample(space, rng).values()) for _ in range(n_candidates)})
+
+    rounds = len(_halving_sizes(len(candidates), eta)) - 1
+    trials = []
+    for round_number in range(rounds + 1):
+        fidelity = eta ** (round_number - rounds)
+
+        scores = []
+        for combination in candidates:
+            if budget.exhausted():
+                break
+            scores.append(_evaluate(objective, dict(zip(space, combination)), trials, budget, fidelity))
+
+        order = np.argsort(scores, kind='stable')[::-1]
+        if budget.exhausted() and fidelity < 1:
+            if len(scores):
+                _evaluate(objective, dict(zip(space, candidates[order[0]])), trials, budget)
+            elif round_number:
+                # the survivors of the previous round come in the order of their scores
+                _evaluate(objective, dict(zip(space, candidates[0])), trials, budget)
+            break
+
+        if fidelity == 1:
+            break
+        candidates = [candidates[i] for i in order[:max(1, len(candidates) // eta)]]
+
+    return trials
+
+
+def tpe_search(objective, space: dict, budget: Budget, seed: int = 0, n_startup: int = 10, gamma: float = 0.25,
+               n_samples: int = 24):
+    """
+    Tree-structured Parzen estimator over discrete values: after n_startup random trials, the trials are split
+    into the best gamma share and the rest. The next params are the candidate, out of n_samples drawn from the value
+    frequencies of the best trials, with the highest ratio of its likelihood under the best trials to the rest.
+    Every dimension is modelled independently, the frequencies are smoothed with one prior count per value.
+    """
+    rng = np.random.default_rng(seed)
+    trials, seen = [], set()
+    size = math.prod(len(values) for values in space.values())
+
+    while not budget.exhausted() and len(seen) < size:
+        if len(trials) < n_startup:
+            params = _sample(space, rng)
+        else:
+            scores = np.array([trial['score'] for trial in trials])
+            order = np.argsort(-scores, kind='stable')
+            n_good = max(1, int(math.ceil(gamma * len(trials))))
+            good, bad = order[:n_good], order[n_good:]
+
+            candidates = np.empty((n_samples, len(space)), dtype=np.intp)
+            log_ratio = np.zeros(n_samples)
+            for dim, (name, values) in enumerate(space.items()):
+                chosen = np.array([values.index(trials[i][name]) for i in range(len(trials))])
+                good_counts = np.bincount(chosen[good], minlength=len(values)) + 1.0
+                bad_counts = np.bincount(chosen[bad], minlength=len(values)) + 1.0
+
+                good_density = good_counts / good_counts.sum()
+                candidates[:, dim] = rng.choice(len(values), n_samples, p=good_density)
+                log_ratio += np.log(good_density[candidates[:, dim]]) - \
+                    np.log(bad_counts[candidates[:, dim]] / bad_counts.sum())
+
+            params = None
+            for i in np.argsort(-log_ratio, kind='stable'):
+                params = {name: values[candidates[i, dim]] for dim, (name, values) in enumerate(space.items())}
+                if tuple(params.values()) not in seen:
+                    break
+            else:
+                # every candidate was tried already, explore
+                params = _sample(space, rng)
+
+        key = tuple(params.values())
+        if key not in seen:
+            seen.add(key)
+            _evaluate(objective, params, trials, budget)
+
+    return trials
+
+
+OPTIMIZERS = {
+    'grid': grid_search,
+    'random': random_search,
+    'halving': successive_halving,
+    'tpe': tpe_search,
+}
+
+
+def optimize(objective, space: dict, method: str = 'tpe', max_evals: int = None, max_seconds: float = None,
+             seed: int = 0, **options):
+    """
+    Run one of OPTIMIZERS within the budget. Returns all the trials as a frame, one column per parameter plus
+    fidelity and score, and the params of the best trial evaluated on the whole data.
+    """
+    if method not in OPTIMIZERS:
+        raise ValueError(f"unknown optimizer {method}, expected one of {list(OPTIMIZERS)}")
+
+    space = {name: list(values) for name, values in space.items()}
+    records = OPTIMIZERS[method](objective, space, Budget(max_evals, max_seconds), seed, **options)
+    trials = pd.DataFrame(records, columns=list(space) + ['fidelity', 'score'])
+
+    complete = [trial for trial in records if trial['fidelity'] == 1 and trial['score'] > -math.inf]
+    if not complete:
+        return trials, None
+
+    best = max(complete, key=lambda trial: trial['score'])
+    return trials, {name: best[name] for name in space}
+
+
+def roc_objective(data, start_date: str, end_date: str, metric: str = 'win_loss_ratio', min_trades: int = 30,
+                  roc_windows=tuple(ROC_SPACE['roc_window'])):
+    """
+    Objective of the ROC strategy over [start_date, end_date] of a parseData frame: the stats metric of the
+    params, -inf with less than min_trades trades (scaled by fidelity) or no closed trade.
+    A lower fidelity evaluates on the first part of the range only. The ROC of all roc_windows is computed
+    once and cached, every evaluation only smooths and slices it.
+    """
+    start = pd.Timestamp(start_date)
+    span = pd.Timestamp(end_date) - start
+
+    def objective(params: dict, fidelity: float = 1.0):
+        end = end_date if fidelity >= 1 else str((start + span * fidelity).date())
+        try:
+            stats = roc_ma.backtest_grid_cell(data, params['roc_window'], params['sma_window'], [params['exit']],
+                                              start_date, end, roc_windows, params.get('entry', 2))[0]
+        except ZeroDivisionError:
+            return -math.inf
+
+        if stats['total_trades'] < min_trades * fidelity:
+            return -math.inf
+
+        return float(stats[metric])
+
+    return objective
+
+
+if __name__ == '__main__':
+    # the in-sample range of roc_ma.py
+    dataset = roc_ma.parseData('./resources/LKOH.csv', None, '2018-01-01')
+    objective = roc_objective(dataset, '2000-01-01', '2018-01-01')
+    size = math.prod(len(values) for values in ROC_SPACE.values())
+
+    for method in OPTIMIZERS:
+        start = time.perf_counter()
+        trials, best = optimize(objective, ROC_SPACE, method, max_evals=size if method == 'grid' else 150)
+        print(f"{method:>8}: {len(trials):5} evaluations of {size}, {time.perf_counter() - start:6.1f} s, "
+              f"best score {trials['score'].max():.2f} with {best}")
@@ -0,0 +1,169 @@
+"""
+Opt-in per-stage instrumentation of the pipeline: wall time, calls, rows and allocated bytes of every function
+decorated with @stage, plus an optional cProfile trace. While disabled a stage costs one flag check.
+
+    with profiling.profiled(trace='backtest.prof', memory=True):
+        roc_ma.backtest(...)
+
+Times are inclusive, a stage that calls other stages includes their time. Stages run in sweep worker processes
+are sent back with the results and added up in the parent.
+"""
+import cProfile
+import functools
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# stage name: [calls, seconds, rows, peak bytes allocated]
+_stats = {}
+_enabled = False
+_memory = False
+_owns_tracing = False
+_profiler = None
+# [traced memory at the start, peak reached] of the stages being run, innermost last
+_peaks = []
+
+
+def is_enabled():
+    return _enabled
+
+
+def options():
+    """What a worker process needs to record the same way as this one, see enable."""
+    return {'memory': _memory} if _enabled else None
+
+
+def enable(memory: bool = False, trace: bool = False):
+    """
+    Start recording. memory=True traces allocations (tracemalloc, slows the code down noticeably),
+    trace=True runs cProfile over everything until disable.
+    """
+    global _enabled, _memory, _owns_tracing, _profiler
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _owns_tracing = True
+    if trace:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def disable(trace_path: str = None):
+    """Stop recording, and write the cProfile trace (pstats format, e.g. for snakeviz) to trace_path."""
+    global _enabled, _memory, _owns_tracing, _profiler
+    if _profiler is not None:
+        _profiler.disable()
+        if trace_path:
+            _profiler.dump_stats(trace_path)
+        _profiler = None
+    if _owns_tracing:
+        tracemalloc.stop()
+        _owns_tracing = False
+
+    _enabled = False
+    _memory = False
+
+
+def reset():
+    _stats.clear()
+
+
+def drain():
+    """Return the recorded stats and start from zero, used to send a worker's stats to the parent."""
+    stats = {name: list(values) for name, values in _stats.items()}
+    _stats.clear()
+
+    return stats
+
+
+def merge(stats: dict):
+    for name, values in stats.items():
+        total = _stats.setdefault(name, [0, 0.0, 0, 0])
+        for i, value in enumerate(values):
+            total[i] += value
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+
+    return 0
+
+
+def _run(name, func, args, kwargs):
+    if _memory:
+        current, peak = tracemalloc.get_traced_memory()
+        # the peak is reset for this stage, keep the one reached so far by the stage around it
+        if _peaks:
+            _peaks[-1][1] = max(_peaks[-1][1], peak)
+        _peaks.append([current, 0])
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+
+        allocated = 0
+        if _memory:
+            _, peak = tracemalloc.get_traced_memory()
+            current, inner_peak = _peaks.pop()
+            peak = max(peak, inner_peak)
+            allocated = max(peak - current, 0)
+            if _peaks:
+                _peaks[-1][1] = max(_peaks[-1][1], peak)
+
+        stats = _stats.setdefault(name, [0, 0.0, 0, 0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[3] += allocated
+
+    stats[2] += (_rows(args[0]) if args else 0) or _rows(result)
+
+    return result
+
+
+def stage(name: str = None):
+    """Decorator recording the calls of a function under name (the function name by default)."""
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            return _run(stage_name, func, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def report():
+    """The recorded stats, one row per stage, slowest first."""
+    table = pd.DataFrame.from_dict(_stats, orient='index', columns=['calls', 'seconds', 'rows', 'bytes'])
+    table.index.name = 'stage'
+    table['seconds_per_call'] = table['seconds'] / table['calls']
+    table['rows_per_second'] = table['rows'] / table['seconds']
+
+    return table.sort_values('seconds', ascending=False)
+
+
+@contextmanager
+def profiled(trace: str = None, memory: bool = False, show: bool = True):
+    """Record the stages run inside the block, print the report after it and write the cProfile trace to trace."""
+    reset()
+    enable(memory=memory, trace=trace is not None)
+    try:
+        yield
+    finally:
+        disable(trace)
+        if show:
+            print(report().to_string())
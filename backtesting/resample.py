@@ -0,0 +1,71 @@
+"""
+OHLCV bars aggregated to a coarser timeframe in one pass over arrays: the first open, the highest high,
+the lowest low, the last close and the total volume of every period, dated by the start of the period.
+
+Timeframes are fixed lengths ('15min', '1h', '4h', '2D'), counted from 1970-01-01, or pandas Period frequencies
+('D' days, 'W' weeks from Monday, 'M' months, 'Q', 'Y').
+"""
+import numpy as np
+import pandas as pd
+
+
+def period_starts(timestamps, timeframe: str = 'D'):
+    """The start of the timeframe period of every timestamp."""
+    timestamps = pd.DatetimeIndex(timestamps)
+
+    # fixed lengths ('15min', '4h', '2D') are floored, calendar periods ('D', 'W', 'M') go through Period;
+    # '1W' parses as 7 days from a Thursday, weeks stay calendar weeks
+    try:
+        step = None if timeframe.upper().endswith('W') else pd.Timedelta(timeframe)
+    except ValueError:
+        step = None
+
+    if step is not None:
+        return timestamps.floor(step)
+
+    return timestamps.to_period(timeframe).start_time
+
+
+def resample_bars(bars, timeframe: str = 'D'):
+    """
+    Aggregate bars sorted by time (a DataFrame of PRICE_COLUMNS on a DatetimeIndex) to the timeframe.
+    Bars that are already one per period are only relabeled, their columns are not copied.
+    """
+    labels = period_starts(bars.index, timeframe).to_numpy('datetime64[ns]')
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if len(labels) else np.empty(0, np.intp)
+    index = pd.DatetimeIndex(labels[starts], name=bars.index.name)
+
+    if len(starts) == len(bars):
+        resampled = bars.copy(deep=False)
+        resampled.index = index
+        return resampled
+
+    ends = np.r_[starts[1:], len(bars)]
+    return pd.DataFrame({
+        'open': bars['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(bars['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(bars['low'].to_numpy(), starts),
+        'close': bars['close'].to_numpy()[ends - 1],
+        'volume': np.add.reduceat(bars['volume'].to_numpy(), starts),
+    }, index=index)
+
+
+def iter_resampled(chunks, timeframe: str = 'D'):
+    """
+    resample_bars over blocks of bars sorted by time, block by block. The bars of the last period of a block
+    are held back and completed by the next block, so every period is aggregated whole, as in one pass.
+    """
+    carry = None
+    for chunk in chunks:
+        bars = chunk if carry is None else pd.concat([carry, chunk])
+        if not len(bars):
+            continue
+
+        labels = period_starts(bars.index, timeframe).asi8
+        last = np.searchsorted(labels, labels[-1])
+        if last:
+            yield resample_bars(bars.iloc[:last], timeframe)
+        carry = bars.iloc[last:]
+
+    if carry is not None and len(carry):
+        yield resample_bars(carry, timeframe)
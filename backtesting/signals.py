@@ -0,0 +1,187 @@
+"""
+Signal rules as expressions over indicators, evaluated vectorized:
+
+    fast, slow = sma(close, 50), sma(close, 200)
+    rules = {
+        'buy': (rsi(close, 14) < 30) & (fast > slow),
+        'sell': (rsi(close, 14) > 70) & (fast < slow),
+    }
+    evaluate_rules(data, rules)
+
+Nodes are identified by their structure, so a node used by several rules (rsi(close, 14), fast, slow above)
+is computed once per evaluation. Rules come out as int8 columns: 1/0 for conditions, 1/-1/0 for sign and signal.
+"""
+import operator
+
+import numpy as np
+import pandas as pd
+
+from backtesting.indicators import rate_of_change, rolling_mean, rsi as rsi_values
+
+
+class Node:
+    """An expression over the columns of a frame, built with the functions and operators below."""
+
+    def __init__(self, op: str, *args):
+        self.op = op
+        self.args = args
+        self.key = (op,) + tuple(arg.key if isinstance(arg, Node) else ('const', arg) for arg in args)
+
+    def _binary(self, op, other, reverse=False):
+        return Node(op, other, self) if reverse else Node(op, self, other)
+
+    def __lt__(self, other):
+        return self._binary('lt', other)
+
+    def __le__(self, other):
+        return self._binary('le', other)
+
+    def __gt__(self, other):
+        return self._binary('gt', other)
+
+    def __ge__(self, other):
+        return self._binary('ge', other)
+
+    def __and__(self, other):
+        return self._binary('and', other)
+
+    def __or__(self, other):
+        return self._binary('or', other)
+
+    def __invert__(self):
+        return Node('not', self)
+
+    def __add__(self, other):
+        return self._binary('add', other)
+
+    def __radd__(self, other):
+        return self._binary('add', other, reverse=True)
+
+    def __sub__(self, other):
+        return self._binary('sub', other)
+
+    def __rsub__(self, other):
+        return self._binary('sub', other, reverse=True)
+
+    def __mul__(self, other):
+        return self._binary('mul', other)
+
+    def __rmul__(self, other):
+        return self._binary('mul', other, reverse=True)
+
+    def __truediv__(self, other):
+        return self._binary('div', other)
+
+    def __rtruediv__(self, other):
+        return self._binary('div', other, reverse=True)
+
+    def __neg__(self):
+        return Node('neg', self)
+
+    def __repr__(self):
+        args = ', '.join(repr(arg) for arg in self.args)
+        return f"{self.op}({args})"
+
+
+def col(name: str):
+    """A column of the frame."""
+    return Node('col', name)
+
+
+close = col('close')
+
+
+def sma(values: Node, window: int):
+    return Node('sma', values, window)
+
+
+def roc(values: Node, window: int):
+    return Node('roc', values, window)
+
+
+def rsi(values: Node, window: int = 14):
+    return Node('rsi', values, window)
+
+
+def sign(values: Node):
+    """1 where values > 0, -1 where values < 0, 0 otherwise (NaN included)."""
+    return Node('sign', values)
+
+
+def signal(long: Node, short: Node):
+    """1 where the long condition holds, -1 where the short one does (and the long one doesn't), 0 otherwise."""
+    return Node('signal', long, short)
+
+
+def _sign(values):
+    return (values > 0).view(np.int8) - (values < 0).view(np.int8)
+
+
+def _signal(long, short):
+    return np.where(long, 1, np.where(short, -1, 0)).astype(np.int8)
+
+
+_OPERATIONS = {
+    'sma': rolling_mean,
+    'roc': rate_of_change,
+    'rsi': rsi_values,
+    'sign': _sign,
+    'signal': _signal,
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'and': operator.and_,
+    'or': operator.or_,
+    'not': operator.invert,
+    'add': operator.add,
+    'sub': operator.sub,
+    'mul': operator.mul,
+    'div': operator.truediv,
+    'neg': operator.neg,
+}
+
+
+class Evaluator:
+    """Evaluates nodes over one frame, every distinct node once: the values are kept by node structure."""
+
+    def __init__(self, data):
+        self.data = data
+        self.values = {}
+
+    def __call__(self, node):
+        if not isinstance(node, Node):
+            return node
+
+        if node.key not in self.values:
+            if node.op == 'col':
+                value = self.data[node.args[0]].to_numpy()
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    value = _OPERATIONS[node.op](*[self(arg) for arg in node.args])
+            self.values[node.key] = value
+
+        return self.values[node.key]
+
+
+def evaluate_signal(data, rule: Node, out=None):
+    """One rule over the frame as an int8 array, written into out if given."""
+    if out is None:
+        out = np.empty(len(data), dtype=np.int8)
+
+    out[:] = Evaluator(data)(rule)
+    return out
+
+
+def evaluate_rules(data, rules: dict):
+    """
+    Many rules over the same frame in one pass, the nodes they share are computed once.
+    Returns an int8 frame, one column per rule, on the index of data.
+    """
+    evaluator = Evaluator(data)
+
+    signals = np.empty((len(data), len(rules)), dtype=np.int8)
+    for i, rule in enumerate(rules.values()):
+        signals[:, i] = evaluator(rule)
+
+    return pd.DataFrame(signals, index=data.index, columns=list(rules), copy=False)
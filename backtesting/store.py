@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from backtesting.data import file_hash
+
+# sweep results, one row per (data file content, strategy, params, code version)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    data_hash TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    params TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    created TEXT NOT NULL,
+    PRIMARY KEY (data_hash, strategy, params, code_version)
+)
+"""
+
+
+def code_version(*modules):
+    """Hash of the source files of the modules a strategy runs, any edit to them starts a fresh set of results."""
+    sha1 = hashlib.sha1()
+    for module in modules:
+        with open(module.__file__, 'rb') as f:
+            sha1.update(f.read())
+
+    return sha1.hexdigest()[:12]
+
+
+def ticker_name(file_name: str):
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+def _params_key(params: dict):
+    # the same params always give the same text, whatever the order they were passed in
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class ResultStore:
+    """
+    SQLite file of sweep results. Every result is committed as soon as it is added, so an interrupted sweep
+    keeps what it has done, and a rerun of the same sweep over the same data and code only computes the rest.
+    """
+
+    def __init__(self, path: str = 'results.sqlite'):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def computed(self, data_hash: str, strategy: str, version: str):
+        """Stats of the results already stored for a data file, strategy and code version, keyed by params text."""
+        rows = self._db.execute(
+            "SELECT params, stats FROM results WHERE data_hash = ? AND strategy = ? AND code_version = ?",
+            (data_hash, strategy, version)
+        )
+
+        return {params: json.loads(stats) for params, stats in rows}
+
+    def add(self, data_hash: str, strategy: str, version: str, ticker: str, results):
+        """Store (params, stats) pairs in one transaction, replacing the stats stored for the same key."""
+        created = datetime.now().isoformat(timespec='seconds')
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(data_hash, strategy, _params_key(params), version, ticker, json.dumps(stats, default=float), created)
+                 for params, stats in results]
+            )
+
+    def query(self, strategy: str = None, ticker: str = None, version: str = None):
+        """Stored results as a frame: one row per result, the key columns plus one column per params and stats key."""
+        conditions, values = [], []
+        for column, value in (('strategy', strategy), ('ticker', ticker), ('code_version', version)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._db.execute(
+            f"SELECT ticker, strategy, code_version, data_hash, created, params, stats FROM results{where}", values
+        ).fetchall()
+
+        records = [
+            {'ticker': ticker, 'strategy': strategy, 'code_version': version, 'data_hash': data_hash,
+             'created': created, **json.loads(params), **json.loads(stats)}
+            for ticker, strategy, version, data_hash, created, params, stats in rows
+        ]
+
+        return pd.DataFrame(records)
+
+    def best(self, metric: str = 'win_loss_ratio', strategy: str = None, min_trades: int = 0):
+        """The stored result with the highest metric for every ticker."""
+        results = self.query(strategy)
+        if results.empty:
+            return results
+
+        if 'total_trades' in results:
+            results = results[results['total_trades'] >= min_trades]
+        score = pd.to_numeric(results[metric], errors='coerce')
+
+        return results.loc[score.groupby(results['ticker']).idxmax().dropna()].set_index('ticker')
+
+
+def stored_sweep(store: ResultStore, file_name: str, strategy: str, version: str, cells, run_cells):
+    """
+    Results of a sweep, computing only the cells missing in the store.
+    cells is a list of (cell, [params of every result of the cell]); run_cells(cells) yields, in order,
+    the list of stats of each given cell, one per its params. Each cell is stored as soon as it is done.
+    Returns the (params, stats) of all the results, in cell order.
+    """
+    data_hash = file_hash(file_name)
+    ticker = ticker_name(file_name)
+    done = store.computed(data_hash, strategy, version)
+
+    missing = [(cell, keys) for cell, keys in cells if not all(_params_key(params) in done for params in keys)]
+    for (cell, keys), cell_stats in zip(missing, run_cells([cell for cell, _ in missing])):
+        results = list(zip(keys, cell_stats))
+        store.add(data_hash, strategy, version, ticker, results)
+        done.update((_params_key(params), stats) for params, stats in results)
+
+    return [(params, done[_params_key(params)]) for _, keys in cells for params in keys]
@@ -0,0 +1,187 @@
+import math
+from collections import deque
+
+import pandas as pd
+
+from backtesting.data import read_price_csv
+
+
+class RollingROC:
+    """Rate of Change, %, over `window` bars, one close at a time; NaN until window + 1 closes are seen."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._closes = deque(maxlen=window + 1)
+
+    def update(self, close: float):
+        self._closes.append(close)
+        if len(self._closes) <= self.window:
+            return math.nan
+
+        previous = self._closes[0]
+        return (close - previous) / previous * 100 if previous else math.nan
+
+
+class RollingSMA:
+    """
+    Simple moving average, one value at a time; NaN until the window holds `window` non-NaN values.
+    It keeps the ring of the last cumulative sums, the same arithmetic as indicators.rolling_mean,
+    so it reproduces the batch values exactly.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._sum = 0.0
+        self._count = 0
+        self._sums = deque([0.0], maxlen=window + 1)
+        self._counts = deque([0], maxlen=window + 1)
+
+    def update(self, value: float):
+        if not math.isnan(value):
+            self._sum += value
+            self._count += 1
+
+        self._sums.append(self._sum)
+        self._counts.append(self._count)
+        if len(self._sums) <= self.window or self._count - self._counts[0] != self.window:
+            return math.nan
+
+        return (self._sum - self._sums[0]) / self.window
+
+
+class RollingRSI:
+    """Relative Strength Index with Wilder smoothing, one close at a time, the same arithmetic as indicators.rsi."""
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        self._alpha = 1 / window
+        self._previous = None
+        self._up = None
+        self._down = None
+        self._seen = 0
+
+    def _smooth(self, average, value):
+        # the update of pandas ewm(adjust=False), which skips it when the value equals the average
+        if average is None or average == value:
+            return value
+
+        old_weight = 1 - self._alpha
+        return (old_weight * average + self._alpha * value) / (old_weight + self._alpha)
+
+    def update(self, close: float):
+        diff = math.nan if self._previous is None else close - self._previous
+        self._previous = close
+
+        self._up = self._smooth(self._up, diff if diff > 0 else 0.0)
+        self._down = self._smooth(self._down, -diff if diff < 0 else -0.0)
+        self._seen += 1
+
+        if self._seen < self.window:
+            return math.nan
+        if self._down == 0:
+            return 100.0
+
+        return 100 - (100 / (1 + self._up / self._down))
+
+
+class SMACrossover:
+    """1 while the fast SMA is above the slow one, -1 while below, 0 otherwise (or while warming up)."""
+
+    def __init__(self, fast: int, slow: int):
+        self.fast = RollingSMA(fast)
+        self.slow = RollingSMA(slow)
+
+    def update(self, close: float):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+
+        return 1 if fast > slow else -1 if fast < slow else 0
+
+
+class RunLengthActions:
+    """
+    The run rule of prepare_buy_sell_actions on a live signal: a buy for a run of 1 longer than entry bars,
+    a sell for a run of -1 longer than exit bars. The action is known once the run gets long enough,
+    and it belongs to the first bar of the run: update returns (run start timestamp, run start close, action).
+    """
+
+    def __init__(self, exit: int, entry: int = 2):
+        self.exit = exit
+        self.entry = entry
+        self._signal = None
+        self._length = 0
+        self._start = None
+
+    def update(self, timestamp, close: float, signal: int):
+        if signal != self._signal:
+            self._signal = signal
+            self._length = 0
+            self._start = (timestamp, close)
+        self._length += 1
+
+        if signal == 1 and self._length == self.entry + 1:
+            return self._start + ('buy',)
+        if signal == -1 and self._length == self.exit + 1:
+            return self._start + ('sell',)
+
+        return None
+
+
+class StreamingROCStrategy:
+    """
+    The ROC strategy of roc_ma.py on a live feed, O(1) work per bar.
+    Bars before trade_from only warm the indicators up, like the history before start_date in a backtest.
+    """
+
+    def __init__(self, roc_window: int, sma_window: int, exit: int, trade_from=None, entry: int = 2):
+        self.roc = RollingROC(roc_window)
+        self.sma = RollingSMA(sma_window)
+        self.actions = RunLengthActions(exit, entry)
+        self.trade_from = pd.Timestamp(trade_from) if trade_from is not None else None
+
+    def update(self, timestamp, close: float):
+        """Feed one bar, returns (run start timestamp, run start close, 'buy' | 'sell') or None."""
+        smoothed_roc = self.sma.update(self.roc.update(close))
+        signal = 1 if smoothed_roc > 0 else -1 if smoothed_roc < 0 else 0
+
+        if self.trade_from is not None and timestamp < self.trade_from:
+            return None
+
+        return self.actions.update(timestamp, close, signal)
+
+
+class SMACrossoverStrategy:
+    """
+    The SMA crossover of anti_martingale.py on a live feed: a buy when the fast SMA crosses above the slow one,
+    a sell when it crosses below. Same update interface as StreamingROCStrategy.
+    """
+
+    def __init__(self, fast: int = 20, slow: int = 40, trade_from=None):
+        self.crossover = SMACrossover(fast, slow)
+        self.trade_from = pd.Timestamp(trade_from) if trade_from is not None else None
+        self._signal = 0
+
+    def update(self, timestamp, close: float):
+        """Feed one bar, returns (timestamp, close, 'buy' | 'sell') on the bar of a crossover or None."""
+        signal = self.crossover.update(close)
+        changed, self._signal = signal != self._signal, signal
+
+        if not changed or signal == 0 or (self.trade_from is not None and timestamp < self.trade_from):
+            return None
+
+        return timestamp, close, 'buy' if signal == 1 else 'sell'
+
+
+def replay_csv(file_name: str, strategy, start_date=None, end_date=None, timeframe: str = 'D'):
+    """Feed the bars of a CSV file, on the timeframe, to a strategy one by one and collect the actions it emits."""
+    data = read_price_csv(file_name, end_date=end_date, timeframe=timeframe)
+    if start_date is not None and strategy.trade_from is None:
+        strategy.trade_from = pd.Timestamp(start_date)
+
+    events = []
+    for timestamp, close in zip(data.index, data['close'].to_numpy()):
+        event = strategy.update(timestamp, close)
+        if event is not None:
+            events.append(event)
+
+    return pd.DataFrame(events, columns=['timestamp', 'close', 'action'])
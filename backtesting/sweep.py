@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtesting import profiling
+
+# (shared memory block, frame) attached by a worker process
+_shared = None
+
+
+def share_frame(data):
+    """
+    Copy the index and the columns of a frame with 8-byte dtypes (float64, int64, datetime64[ns])
+    into one shared memory block, one row per column.
+    Returns the block and the layout a worker needs to attach to it.
+    """
+    columns = [data.index.to_numpy()] + [data[col].to_numpy() for col in data.columns]
+    for values in columns:
+        if values.dtype.itemsize != 8 or values.dtype == object:
+            raise TypeError(f"cannot share a column of dtype {values.dtype}")
+
+    block = shared_memory.SharedMemory(create=True, size=max(len(columns) * len(data) * 8, 1))
+    table = np.ndarray((len(columns), len(data)), dtype=np.int64, buffer=block.buf)
+    for i, values in enumerate(columns):
+        table[i] = values.view(np.int64)
+
+    layout = {
+        'name': block.name,
+        'rows': len(data),
+        'index_name': data.index.name,
+        'columns': list(data.columns),
+        'dtypes': [values.dtype.str for values in columns],
+        'attrs': dict(data.attrs),
+    }
+
+    return block, layout
+
+
+def attach_frame(layout):
+    """Rebuild a frame on top of a shared memory block created by share_frame, without copying."""
+    block = shared_memory.SharedMemory(name=layout['name'])
+    table = np.ndarray((len(layout['dtypes']), layout['rows']), dtype=np.int64, buffer=block.buf)
+    columns = [table[i].view(dtype) for i, dtype in enumerate(layout['dtypes'])]
+
+    data = pd.DataFrame(
+        dict(zip(layout['columns'], columns[1:])),
+        index=pd.Index(columns[0], name=layout['index_name']),
+        copy=False
+    )
+    data.attrs.update(layout['attrs'])
+
+    return block, data
+
+
+def _attach(layout, profiling_options):
+    global _shared
+    _shared = attach_frame(layout)
+    if profiling_options is not None:
+        # a forked worker starts with a copy of the parent's stats, they are already counted there
+        profiling.reset()
+        profiling.enable(**profiling_options)
+
+
+def _evaluate(evaluate, params):
+    result = evaluate(_shared[1].copy(deep=False), *params)
+
+    # the stages recorded by the worker go back with the result
+    return result, profiling.drain() if profiling.is_enabled() else None
+
+
+def iter_sweep(evaluate, data, grid, workers: int = None):
+    """
+    Call evaluate(data, *params) for every params tuple of the grid and yield the results in grid order,
+    each one as soon as it (and the ones before it) are done.
+    With more than one worker the calls are spread over a process pool; the frame is placed in shared memory once
+    and every worker maps it, instead of pickling it per task. evaluate must be a module-level function.
+    workers defaults to the number of CPUs.
+    """
+    grid = list(grid)
+    workers = min(workers or os.cpu_count() or 1, len(grid))
+
+    if workers <= 1:
+        for params in grid:
+            yield evaluate(data.copy(deep=False), *params)
+        return
+
+    block, layout = share_frame(data)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(layout, profiling.options())) as pool:
+            chunksize = max(1, len(grid) // (workers * 4))
+            for result, stats in pool.map(_evaluate, repeat(evaluate), grid, chunksize=chunksize):
+                if stats:
+                    profiling.merge(stats)
+                yield result
+    finally:
+        block.close()
+        block.unlink()
+
+
+def run_sweep(evaluate, data, grid, workers: int = None):
+    """The results of iter_sweep as a list."""
+    return list(iter_sweep(evaluate, data, grid, workers))
@@ -0,0 +1,119 @@
+"""
+Trades as preallocated column arrays instead of lists of dicts: one contiguous array per field, grown by doubling,
+so appending is amortized O(1), filtering is a boolean mask over all the columns at once,
+and the columns go into pandas (and Arrow) without a copy.
+"""
+import numpy as np
+import pandas as pd
+
+# field: dtype. An open trade has exit_index -1, NaN exit price, return and pnl
+COLUMNS = {
+    'entry_index': np.int64,
+    'exit_index': np.int64,
+    'entry_price': np.float64,
+    'exit_price': np.float64,
+    'side': np.int8,  # 1 long, -1 short
+    'size': np.float64,
+    'return': np.float64,
+    'pnl': np.float64,
+    'capital': np.float64,  # capital after the trade
+}
+
+# missing fields of an appended trade
+DEFAULTS = {
+    'exit_index': -1,
+    'exit_price': np.nan,
+    'side': 1,
+    'size': 1.0,
+    'return': np.nan,
+    'pnl': np.nan,
+    'capital': np.nan,
+}
+
+
+class TradeLog:
+    """
+    A table of trades with the fields of COLUMNS.
+    log['pnl'] is a view of a column, log[mask] / log[indexes] a new log of those trades.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._size = 0
+
+    @classmethod
+    def from_arrays(cls, **columns):
+        """A log over whole columns, missing fields are filled from DEFAULTS."""
+        size = len(next(iter(columns.values()))) if columns else 0
+        log = cls(0)
+        for name, dtype in COLUMNS.items():
+            values = columns[name] if name in columns else np.full(size, DEFAULTS[name])
+            log._columns[name] = np.ascontiguousarray(values, dtype=dtype)
+        log._size = size
+
+        return log
+
+    def _reserve(self, size: int):
+        capacity = len(self._columns['entry_index'])
+        if size <= capacity:
+            return
+
+        capacity = max(size, 2 * capacity)
+        for name, values in self._columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._columns[name] = grown
+
+    def append(self, **trade):
+        """Add one trade: entry_index and entry_price at least, the rest from DEFAULTS."""
+        self._reserve(self._size + 1)
+        for name, values in self._columns.items():
+            values[self._size] = trade[name] if name in trade else DEFAULTS[name]
+        self._size += 1
+
+    def extend(self, **columns):
+        """Add many trades at once, given as arrays of equal length."""
+        size = len(columns['entry_index'])
+        self._reserve(self._size + size)
+        for name, values in self._columns.items():
+            values[self._size:self._size + size] = columns[name] if name in columns else DEFAULTS[name]
+        self._size += size
+
+    def close(self, row: int, exit_index: int, exit_price: float):
+        """Close an open trade, its return and pnl follow from the prices, the side and the size."""
+        entry_price = self._columns['entry_price'][row]
+        trade_return = self._columns['side'][row] * (exit_price - entry_price) / entry_price
+
+        self._columns['exit_index'][row] = exit_index
+        self._columns['exit_price'][row] = exit_price
+        self._columns['return'][row] = trade_return
+        self._columns['pnl'][row] = self._columns['size'][row] * trade_return
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._columns[key][:self._size]
+
+        return TradeLog.from_arrays(**{name: self[name][key] for name in COLUMNS})
+
+    @property
+    def is_open(self):
+        return self['exit_index'] < 0
+
+    def closed(self):
+        return self[~self.is_open]
+
+    def to_pandas(self):
+        """The trades as a DataFrame over the column arrays, without copying them."""
+        return pd.DataFrame({name: self[name] for name in COLUMNS}, copy=False)
+
+    def to_arrow(self):
+        """The trades as a pyarrow Table over the column arrays (pyarrow is only needed here)."""
+        import pyarrow as pa
+
+        return pa.table({name: self[name] for name in COLUMNS})
+
+    def __repr__(self):
+        return f"TradeLog({self._size} trades)"
@@ -0,0 +1,272 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtesting import metrics
+from backtesting.data import PRICE_COLUMNS, read_resampled
+from backtesting.engine import match_trades, trade_statistics
+from backtesting.indicators import rate_of_change, rolling_mean
+from backtesting.tradelog import COLUMNS, TradeLog
+
+
+class Panel:
+    """
+    OHLCV bars of many symbols aligned on one date index.
+    values has shape (5, n_dates, n_symbols), fields in PRICE_COLUMNS order. A symbol without a bar on a date
+    carries its previous bar forward, and is NaN before its first bar.
+    has_bar (n_dates x n_symbols) is True where the symbol has a bar of its own, False where it is filled.
+    """
+
+    def __init__(self, dates, symbols, values, has_bar=None):
+        self.dates = dates
+        self.symbols = symbols
+        self.values = values
+        self.has_bar = ~np.isnan(self['close']) if has_bar is None else has_bar
+
+    def __getitem__(self, field: str):
+        """(n_dates x n_symbols) array of one field, e.g. panel['close']."""
+        return self.values[PRICE_COLUMNS.index(field)]
+
+    def slice(self, start_date=None, end_date=None):
+        """A view of the panel on the [start_date, end_date] dates."""
+        window = self.dates.slice_indexer(start_date, end_date)
+        return Panel(self.dates[window], self.symbols, self.values[:, window], self.has_bar[window])
+
+
+def ticker_files(sources):
+    """CSV files of a universe: a directory (all *.csv in it), a single file or a list of files."""
+    if isinstance(sources, str):
+        return sorted(glob.glob(os.path.join(sources, '*.csv'))) if os.path.isdir(sources) else [sources]
+
+    return list(sources)
+
+
+def forward_fill(values):
+    """Carry the last non-NaN value down every column of a 2-D array."""
+    rows = np.where(np.isnan(values), 0, np.arange(len(values))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+
+    return values[rows, np.arange(values.shape[1])]
+
+
+def load_universe(sources, start_date=None, end_date=None, timeframe: str = 'D'):
+    """
+    Read every ticker file as bars of the timeframe, like parseData, and align them on the union of their dates.
+    Symbols are the file names.
+    """
+    files = ticker_files(sources)
+    if not files:
+        raise ValueError(f"no ticker files found in {sources}")
+
+    bars = [read_resampled(file_name, timeframe, start_date, end_date) for file_name in files]
+    symbols = [os.path.splitext(os.path.basename(file_name))[0] for file_name in files]
+
+    dates = np.unique(np.concatenate([symbol_bars.index.to_numpy() for symbol_bars in bars]))
+    values = np.full((len(PRICE_COLUMNS), len(dates), len(files)), np.nan)
+    has_bar = np.zeros((len(dates), len(files)), dtype=bool)
+    for i, symbol_bars in enumerate(bars):
+        rows = np.searchsorted(dates, symbol_bars.index.to_numpy())
+        values[:, rows, i] = symbol_bars[PRICE_COLUMNS].to_numpy().T
+        has_bar[rows, i] = True
+
+    for field in range(len(PRICE_COLUMNS)):
+        values[field] = forward_fill(values[field])
+
+    return Panel(pd.DatetimeIndex(dates, name='timestamp'), symbols, values, has_bar)
+
+
+def own_bars(values, has_bar, fill=np.nan):
+    """
+    Move the bars every symbol has of its own to the top of its column, `fill` below them:
+    a (n_bars of the longest symbol x n_symbols) matrix where indicator windows and signal runs
+    never span a filled date. Returns the matrix and the row of every panel date in it.
+    """
+    rows = np.cumsum(has_bar, axis=0) - 1
+    symbols = np.broadcast_to(np.arange(has_bar.shape[1]), has_bar.shape)
+
+    packed = np.full((int(has_bar.sum(axis=0).max(initial=0)), has_bar.shape[1]), fill, dtype=values.dtype)
+    packed[rows[has_bar], symbols[has_bar]] = values[has_bar]
+
+    return packed, rows
+
+
+def on_dates(packed, rows, has_bar, fill):
+    """The inverse of own_bars: the values back on the panel dates, `fill` on the dates a symbol has no bar."""
+    symbols = np.broadcast_to(np.arange(has_bar.shape[1]), has_bar.shape)
+
+    values = np.full(has_bar.shape, fill, dtype=packed.dtype)
+    values[has_bar] = packed[rows[has_bar], symbols[has_bar]]
+
+    return values
+
+
+def roc_signals(close, roc_window: int, sma_window: int, has_bar=None):
+    """
+    Signals of the ROC strategy for every symbol at once: the sign of SMA(ROC) as an int8 matrix, 0 while NaN.
+    With has_bar, the indicators run on the own bars of every symbol, the filled dates get 0.
+    """
+    if has_bar is not None:
+        packed, rows = own_bars(close, has_bar)
+        return on_dates(roc_signals(packed, roc_window, sma_window), rows, has_bar, 0)
+
+    smoothed_roc = rolling_mean(rate_of_change(close, roc_window), sma_window)
+
+    return np.where(smoothed_roc > 0, 1, np.where(smoothed_roc < 0, -1, 0)).astype(np.int8)
+
+
+def roc_actions(signals, exit: int, entry: int = 2, has_bar=None):
+    """
+    Actions of the ROC strategy for every symbol at once, like prepare_buy_sell_actions:
+    1 (buy) on the first bar of a run of 1 signals longer than entry bars,
+    -1 (sell) on the first bar of a run of -1 signals longer than exit bars, 0 otherwise.
+    With has_bar, runs are counted on the own bars of every symbol, the filled dates get no action.
+    """
+    if has_bar is not None:
+        packed, rows = own_bars(signals, has_bar, fill=0)
+        return on_dates(roc_actions(packed, exit, entry), rows, has_bar, 0)
+
+    n_dates, n_symbols = signals.shape
+    if not signals.size:
+        return np.zeros(signals.shape, dtype=np.int8)
+
+    # run-length encode all symbols in one pass, symbol after symbol, every symbol starts a new run
+    flat = signals.T.ravel()
+    is_run_start = np.r_[True, flat[1:] != flat[:-1]]
+    is_run_start[::n_dates] = True
+
+    starts = np.flatnonzero(is_run_start)
+    lengths = np.diff(np.r_[starts, flat.size])
+    values = flat[starts]
+
+    actions = np.zeros(flat.size, dtype=np.int8)
+    actions[starts[(lengths > entry) & (values == 1)]] = 1
+    actions[starts[(lengths > exit) & (values == -1)]] = -1
+
+    return actions.reshape(n_symbols, n_dates).T
+
+
+def holdings(actions):
+    """Whether every symbol is held after each bar: from a buy until the next sell."""
+    last_action = np.where(actions != 0, np.arange(len(actions))[:, None], -1)
+    np.maximum.accumulate(last_action, axis=0, out=last_action)
+
+    return (last_action >= 0) & (actions[np.maximum(last_action, 0), np.arange(actions.shape[1])] == 1)
+
+
+def portfolio_equity(close, held, initial_capital: float, max_weight: float = None):
+    """
+    Equity curve of one shared capital spread over the held symbols.
+    The capital is split equally between the symbols held at the close of a bar (at most max_weight of it
+    per symbol, the rest stays in cash) and earns their returns over the next bar.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.nan_to_num(close[1:] / close[:-1] - 1)
+
+    held = held[:-1]
+    weights = held / np.maximum(held.sum(axis=1), 1)[:, None]
+    if max_weight is not None:
+        weights = np.minimum(weights, max_weight)
+
+    portfolio_returns = (weights * returns).sum(axis=1)
+
+    return initial_capital * np.r_[1.0, np.cumprod(1 + portfolio_returns)]
+
+
+def universe_statistics(close, actions, symbols):
+    """
+    Trade statistics of calculate_statistics for every symbol, one row per symbol.
+    A symbol without a closed trade on the window gets NaN win rate and average profit instead of raising.
+    """
+    rows = []
+    for i, symbol in enumerate(symbols):
+        buy_index, sell_index, profits = match_trades(actions[:, i] == 1, actions[:, i] == -1, close[:, i])
+
+        if len(profits):
+            stats = trade_statistics(len(buy_index), len(sell_index), profits)
+        else:
+            stats = {
+                'total_profit': 0,
+                'total_trades': len(buy_index) + len(sell_index),
+                'win_rate': np.nan,
+                'win_loss_ratio': format(0, ".2f"),
+                'average_profit': np.nan,
+                'wins': 0,
+                'losses': 0,
+                'buy_orders': len(buy_index),
+                'sell_orders': len(sell_index),
+            }
+
+        rows.append({'symbol': symbol, **stats})
+
+    return pd.DataFrame(rows).set_index('symbol')
+
+
+def run_policy(panel, signals, simulate, initial_capital: float, **params):
+    """
+    Run a capital-management kernel of capital_management.kernels (simulate_anti_martingale, simulate_fixed_size)
+    on the own bars of every symbol, with the initial capital split equally between the symbols.
+    signals (n_dates x n_symbols) are the kernel's signals on the panel dates, past their warm-up;
+    params go to the kernel (base_trade_size, trade_size, ...).
+    Returns the TradeLog of every symbol, its bar indexes on the panel dates, and the equity of the universe:
+    the capital every symbol has after its last closed trade, summed over the symbols.
+    """
+    close = panel['close']
+    share = initial_capital / len(panel.symbols)
+    capital = np.full(close.shape, np.nan)
+
+    logs = {}
+    for i, symbol in enumerate(panel.symbols):
+        dates = np.flatnonzero(panel.has_bar[:, i])
+        if not len(dates):
+            continue
+
+        trades = simulate(signals[dates, i], close[dates, i], share, **params)[0]
+
+        columns = {name: trades[name] for name in COLUMNS}
+        columns['entry_index'] = dates[columns['entry_index']]
+        columns['exit_index'] = np.where(trades.is_open, -1, dates[np.maximum(columns['exit_index'], 0)])
+        logs[symbol] = TradeLog.from_arrays(**columns)
+
+        # the capital after the last of the trades closed on a date
+        closed = logs[symbol].closed()
+        exit_index = closed['exit_index']
+        is_last = np.r_[exit_index[1:] != exit_index[:-1], True]
+        capital[exit_index[is_last], i] = closed['capital'][is_last]
+
+    capital[0] = np.where(np.isnan(capital[0]), share, capital[0])
+    equity = pd.Series(forward_fill(capital).sum(axis=1), index=panel.dates)
+
+    return logs, equity
+
+
+def backtest_universe(sources, roc_window: int, sma_window: int, exit: int, start_date: str, end_date: str,
+                      initial_capital: float = 1_000_000, max_weight: float = None, timeframe: str = 'D'):
+    """
+    Run the ROC strategy over every symbol of a universe at once.
+    Indicators and actions run on the own bars of every symbol, so its statistics are those of backtest_single_run
+    on its file; the common dates only align the symbols for the shared capital.
+    Returns the per-symbol statistics and the equity curve of a shared capital trading all the symbols.
+    """
+    # keep the history before start_date to warm up the indicators
+    panel = load_universe(sources, end_date=end_date, timeframe=timeframe)
+    signals = roc_signals(panel['close'], roc_window, sma_window, panel.has_bar)
+
+    window = panel.dates.slice_indexer(start_date, end_date)
+    close = panel['close'][window]
+    actions = roc_actions(signals[window], exit, has_bar=panel.has_bar[window])
+
+    stats = universe_statistics(close, actions, panel.symbols)
+    equity = pd.Series(portfolio_equity(close, holdings(actions), initial_capital, max_weight),
+                       index=panel.dates[window])
+
+    return stats, equity
+
+
+if __name__ == '__main__':
+    stats, equity = backtest_universe('./resources', roc_window=21, sma_window=100, exit=10,
+                                      start_date='2018-01-01', end_date='2024-08-31')
+    print(stats)
+    print(f"\nFinal capital: {equity.iloc[-1]:.2f}")
+    print(metrics.performance(equity.to_numpy()))
@@ -0,0 +1,97 @@
+import pandas as pd
+
+import roc_ma
+from backtesting.sweep import run_sweep
+
+ROC_WINDOWS = tuple(range(10, 31))
+SMA_WINDOWS = (100, 250)
+EXITS = (5, 10, 15, 20)
+
+
+def walk_forward_folds(first_date, last_date, train_years: int = 5, test_years: int = 1, step_years: int = None):
+    """
+    Rolling (train_start, train_end, test_start, test_end) windows over [first_date, last_date]:
+    every test window directly follows its train window, and the windows move by step_years (test_years by default).
+    Dates are inclusive 'YYYY-MM-DD' strings, like the start/end dates of roc_ma.backtest.
+    """
+    first_date, last_date = pd.Timestamp(first_date).normalize(), pd.Timestamp(last_date).normalize()
+    step = pd.DateOffset(years=step_years or test_years)
+    day = pd.Timedelta(days=1)
+
+    folds = []
+    train_start = first_date
+    while True:
+        test_start = train_start + pd.DateOffset(years=train_years)
+        test_end = test_start + pd.DateOffset(years=test_years) - day
+        if test_start > last_date:
+            break
+
+        folds.append(tuple(str(date.date()) for date in
+                           (train_start, test_start - day, test_start, min(test_end, last_date))))
+        train_start += step
+
+    return folds
+
+
+def _cell_stats(data, roc_window, sma_window, exits, start_date, end_date, roc_windows):
+    """backtest_grid_cell without the exits that have no closed trade in the window."""
+    return roc_ma.backtest_grid_cell(data, roc_window, sma_window, exits, start_date, end_date, roc_windows,
+                                     skip_empty=True)
+
+
+def evaluate_fold(data, train_start: str, train_end: str, test_start: str, test_end: str,
+                  roc_windows=ROC_WINDOWS, sma_windows=SMA_WINDOWS, exits=EXITS, min_trades: int = 30):
+    """
+    Optimize the grid on the train window and run the winner (the best win/loss ratio out of the cells with at
+    least min_trades trades) on the test window. data is the whole history: the indicators are computed once
+    over it and cached, every window only slices them.
+    """
+    fold = {'train_start': train_start, 'train_end': train_end, 'test_start': test_start, 'test_end': test_end}
+
+    candidates = [
+        stats
+        for roc_window in roc_windows
+        for sma_window in sma_windows
+        for stats in _cell_stats(data, roc_window, sma_window, exits, train_start, train_end, roc_windows)
+        if stats['total_trades'] >= min_trades
+    ]
+    if not candidates:
+        return fold
+
+    best = max(candidates, key=lambda stats: float(stats['win_loss_ratio']))
+    fold.update({key: best[key] for key in ('roc_window', 'sma_window', 'exit')})
+    fold['train_win_loss_ratio'] = best['win_loss_ratio']
+    fold['train_total_profit'] = best['total_profit']
+
+    test = _cell_stats(data, best['roc_window'], best['sma_window'], [best['exit']], test_start, test_end,
+                       roc_windows)
+    if test:
+        fold.update({f'test_{key}': test[0][key] for key in
+                     ('total_trades', 'wins', 'losses', 'win_loss_ratio', 'average_profit', 'total_profit')})
+
+    return fold
+
+
+def walk_forward(stock_data_file_name: str, start_date: str = None, end_date: str = None, train_years: int = 5,
+                 test_years: int = 1, step_years: int = None, roc_windows=ROC_WINDOWS, sma_windows=SMA_WINDOWS,
+                 exits=EXITS, min_trades: int = 30, workers: int = None):
+    """
+    Walk-forward optimization of the ROC strategy: re-optimize on every train window and check the winner on the
+    following test window. The file is parsed once and the folds run in parallel on `workers` processes,
+    each process computes the indicators over the whole history once and reuses them for all its folds.
+    Returns one row per fold with the chosen parameters and their out-of-sample stats.
+    """
+    # the history before start_date is kept to warm up the indicators
+    dataset = roc_ma.parseData(stock_data_file_name, None, end_date)
+    first_date = max(pd.Timestamp(start_date), dataset.index[0]) if start_date else dataset.index[0]
+    folds = walk_forward_folds(first_date, dataset.index[-1], train_years, test_years, step_years)
+
+    grid = [fold + (tuple(roc_windows), tuple(sma_windows), tuple(exits), min_trades) for fold in folds]
+
+    return pd.DataFrame(run_sweep(evaluate_fold, dataset, grid, workers))
+
+
+if __name__ == '__main__':
+    folds = walk_forward('./resources/LKOH.csv', start_date='2000-01-01', end_date='2024-08-31',
+                         train_years=5, test_years=1)
+    print(folds.to_string())
@@ -2,33 +2,43 @@ import numpy as np
 import pandas as pd
 
 from capital_management.common import prepare_data
-from ta.trend import sma_indicator
+from capital_management.kernels import simulate_anti_martingale
+from capital_management.monte_carlo import monte_carlo, summary
+from backtesting import metrics
+from backtesting.charts import MAX_POINTS, decimate_line, render
+from backtesting.indicators import sma_matrix
+from backtesting.signals import col, evaluate_signal, signal
 import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 
 
-def visualize(data):
+def visualize(data, path: str = None, max_points: int = MAX_POINTS):
     fig = go.Figure()
 
+    # every line is cut down to max_points with LTTB
+    dates, close = decimate_line(data.index, data['close'], max_points)
+    sma20_dates, sma20 = decimate_line(data.index, data['SMA20'], max_points)
+    sma40_dates, sma40 = decimate_line(data.index, data['SMA40'], max_points)
+
     # plot closing price
     fig.add_trace(
-        go.Scatter(x=data.index,
-                   y=data['close'],
+        go.Scatter(x=dates,
+                   y=close,
                    mode='lines',
                    name='Close Price',
                    line=dict(color='blue', width=2)))
 
     # plot SMAs
     fig.add_trace(
-        go.Scatter(x=data.index,
-                   y=data['SMA20'],
+        go.Scatter(x=sma20_dates,
+                   y=sma20,
                    mode='lines',
                    name='SMA 20',
                    line=dict(color='orange', width=2)))
 
     fig.add_trace(
-        go.Scatter(x=data.index,
-                   y=data['SMA40'],
+        go.Scatter(x=sma40_dates,
+                   y=sma40,
                    mode='lines',
                    name='SMA 40',
                    line=dict(color='green', width=2)))
@@ -41,7 +51,8 @@ def visualize(data):
         showlegend=True
     )
 
-    fig.show()
+    # written to path (.html or an image) if given, shown otherwise
+    render(fig, path)
 
 
 def main():
@@ -49,15 +60,13 @@ def main():
     data = prepare_data("../resources/GMKN.csv")
 
     # compute two simple moving averages (SMA20 and SMA40)
-    data['SMA20'] = sma_indicator(data['close'], window=20)
-    data['SMA40'] = sma_indicator(data['close'], window=40)
+    data['SMA20'], data['SMA40'] = sma_matrix(data['close'].to_numpy(), [20, 40]).T
 
     # generate signals based on the SMA crossovers;
     # when the 20‑day SMA crosses above the 40‑day SMA = LONG;
     # when it crosses below = SHORT
-    data['Signal'] = 0
-    data.loc[(data['SMA20'] > data['SMA40']), 'Signal'] = 1
-    data.loc[(data['SMA20'] < data['SMA40']), 'Signal'] = -1
+    sma20, sma40 = col('SMA20'), col('SMA40')
+    data['Signal'] = evaluate_signal(data, signal(sma20 > sma40, sma20 < sma40))
 
     # remove NA after lag
     data = data.dropna()
@@ -68,131 +77,47 @@ def main():
     # simulation with Anti-Martingale Capital Management
     # initial capital, RUB
     initial_capital = 1_000_000
-    # current
-    capital = initial_capital
 
     # use 1% as an initial trade size, 10k RUB
     base_trade_size = 0.01 * initial_capital
 
-    # this will be doubled if there was a win trade, and reset if it was a loss
-    position_multiplier = 1
+    # the trade size is doubled after a win trade, and reset after a loss;
+    # on every signal change the current trade is closed and the opposite one is opened,
+    # the trade still open at the end of the period is closed at the last available price
+    trades, equity_curve = simulate_anti_martingale(
+        data['Signal'].to_numpy(),
+        data['close'].to_numpy(),
+        initial_capital,
+        base_trade_size
+    )
 
     # each trade profit
-    trade_profits = []
-    # equity curve is a representation of the change in the value of a trading account over time (after each trade)
-    equity_curve = [capital]
+    trade_profits = trades['pnl']
+    capital = equity_curve[-1]
+
     # to store details of every trade
-    trade_details = []
-
-    # to track current open position and statistics
-    in_position = False
-    entry_price = None
-    # long (1) or short(-1)
-    entry_signal = None
-    trade_entry_date = None
-
-    # loop over each day
-    for _, row in data.iterrows():
-        signal = row['Signal']
-        price = row['close']
-
-        if not in_position:
-            in_position = True
-            entry_signal = signal
-            entry_price = price
-            trade_entry_date = row['timestamp']
-        else:
-            # if already in a position, check if the signal reverses the trade
-            if signal != entry_signal:
-                # close the current trade at the current price
-                exit_price = price
-                trade_exit_date = row['timestamp']
-
-                # calculate trade return, %
-                if entry_signal == 1:
-                    # for long
-                    trade_return = (exit_price - entry_price) / entry_price
-                else:
-                    # for short
-                    trade_return = (entry_price - exit_price) / entry_price
-
-                # Determine the trade size using the anti-martingale multiplier.
-                trade_size = base_trade_size * position_multiplier
-
-                # calculate profit for this trade, RUB
-                profit = trade_size * trade_return
-
-                # update capital
-                capital += profit
-
-                # record the trade result
-                trade_profits.append(profit)
-                trade_details.append({
-                    'Entry Date': trade_entry_date,
-                    'Exit Date': trade_exit_date,
-                    'Entry Price': entry_price,
-                    'Exit Price': exit_price,
-                    'Signal': entry_signal,
-                    'Return': trade_return,  # %
-                    'Profit': profit,  # RUB
-                    'Trade Size': trade_size,
-                    'Capital After Trade': capital
-                })
-                equity_curve.append(capital)
-
-                # Anti-Martingale:
-                # if the trade was profitable, double the multiplier;
-                # if not, reset the multiplier back to 1
-                if profit > 0:
-                    position_multiplier *= 2
-                else:
-                    position_multiplier = 1
-
-                # open a new trade with based on the signal (long or short)
-                in_position = True
-                entry_signal = signal
-                entry_price = price
-                trade_entry_date = row['timestamp']
-
-    # if a trade is still open at the end of the period, close it at the last available price
-    if in_position:
-        exit_price = data.iloc[-1]['close']
-        trade_exit_date = data.index[-1]
-
-        if entry_signal == 1:
-            trade_return = (exit_price - entry_price) / entry_price
-        else:
-            trade_return = (entry_price - exit_price) / entry_price
-
-        trade_size = base_trade_size * position_multiplier
-        profit = trade_size * trade_return
-        capital += profit
-        trade_profits.append(profit)
-        trade_details.append({
-            'Entry Date': trade_entry_date,
-            'Exit Date': trade_exit_date,
-            'Entry Price': entry_price,
-            'Exit Price': exit_price,
-            'Signal': entry_signal,
-            'Return': trade_return,
-            'Profit': profit,
-            'Trade Size': trade_size,
-            'Capital After Trade': capital
-        })
-        equity_curve.append(capital)
+    timestamps = data['timestamp'].to_numpy()
+    trade_details = {
+        'Entry Date': timestamps[trades['entry_index']],
+        'Exit Date': timestamps[trades['exit_index']],
+        'Entry Price': trades['entry_price'],
+        'Exit Price': trades['exit_price'],
+        'Signal': trades['side'],
+        'Return': trades['return'],  # %
+        'Profit': trades['pnl'],  # RUB
+        'Trade Size': trades['size'],
+        'Capital After Trade': trades['capital']
+    }
 
     # Performance Metrics
     total_profit = capital - initial_capital
     # standard deviation
     std_profit = np.std(trade_profits)
     # Drawdown: the largest drop (in %) from a peak in the equity curve
-    equity_array = np.array(equity_curve)
-    max = np.maximum.accumulate(equity_array)
-    drawdowns = (max - equity_array) / max
-    max_drawdown = np.max(drawdowns) * 100  # %
+    max_drawdown = metrics.max_drawdown(equity_curve) * 100  # %
 
-    # Sharpe Ratio:
-    sharpe_ratio = np.mean(trade_profits) / std_profit
+    # Sharpe Ratio, per trade:
+    sharpe_ratio = metrics.sharpe(trade_profits, periods_per_year=1)
 
     print("=== Trading Performance Indicators ===")
     print("Total Profit: {:.2f} rubles".format(total_profit))
@@ -200,6 +125,14 @@ def main():
     print("Maximum Drawdown: {:.2f}%".format(max_drawdown))
     print("Sharpe Ratio: {:.2f}".format(sharpe_ratio))
 
+    # robustness: 10k paths resampled from these trades (blocks of 5 trades keep the win/loss streaks)
+    paths, _ = monte_carlo(trades['return'], 'anti_martingale', n_paths=10_000, block_size=5,
+                           initial_capital=initial_capital, base_trade_size=base_trade_size)
+    distribution, ruin_probability = summary(paths)
+    print("\n=== Monte Carlo, 10000 block bootstrap paths ===")
+    print(distribution)
+    print("Probability of Ruin (capital at 50% or less): {:.2f}%".format(ruin_probability * 100))
+
     trades_df = pd.DataFrame(trade_details)
     print("\nTrade Details:")
     print(trades_df)
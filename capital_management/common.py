@@ -1,16 +1,13 @@
-import pandas as pd
+from backtesting.data import read_resampled
 
 
-def prepare_data(stock_data_file_name: str):
-    df = pd.read_csv(stock_data_file_name,
-                     decimal=',',
-                     parse_dates=['timestamp'],
-                     date_parser=lambda x: pd.to_datetime(x, format='%y%m%d'))
+def prepare_data(stock_data_file_name: str, timeframe: str = 'D'):
+    # intraday bars are aggregated per day (or timeframe) before the time of day is dropped
+    df = read_resampled(stock_data_file_name, timeframe).reset_index()
 
     df['timestamp'] = df['timestamp'].dt.strftime("%Y-%m-%d")
-    df.set_index('timestamp')
 
     for col in ['open', 'high', 'low', 'close', 'volume']:
-        df[col] = df[col].astype(float).round(2)
+        df[col] = df[col].round(2)
 
     return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
@@ -1,16 +1,18 @@
+import numpy as np
 from capital_management.common import prepare_data
-from ta.momentum import ROCIndicator
+from capital_management.sizing import sizing_sweep
+from backtesting.indicators import roc_matrix
+from backtesting.signals import col, evaluate_signal, sign
 import matplotlib.pyplot as plt
 
 
 def main():
     data = prepare_data("../resources/GMKN.csv")
     # roc window is 10, there is no a reason behind it
-    data['roc'] = ROCIndicator(data['close'], window=10).roc()
+    data['roc'] = roc_matrix(data['close'].to_numpy(), [10])[:, 0]
 
-    data['signal'] = 0
-    data['signal'][data['roc'] > 0] = 1  # buy
-    data['signal'][data['roc'] < 0] = -1  # sell
+    # 1 buy on a positive ROC, -1 sell on a negative one
+    data['signal'] = evaluate_signal(data, sign(col('roc')))
 
     data = data.dropna()
 
@@ -22,50 +24,20 @@ def main():
         range(1000, 2000, 1000),
     ]
 
-    profits = []
-    ratios = []
+    # trade size in %; the trades are the same for every size, they are taken from the signals once
+    # and all the sizes are applied to them together
+    trade_sizes = np.array([trade_size for trade_size_range in trade_sizes_ranges for trade_size in trade_size_range])
+    sizing, _, _ = sizing_sweep(data['signal'].to_numpy(), data['close'].to_numpy(), initial_capital,
+                                trade_sizes=trade_sizes)
+    final_profits = sizing['final_profit'].to_numpy()
 
-    for trade_size_range in trade_sizes_ranges:
-        # trade size in %
-        for trade_size in trade_size_range:
-            capital = initial_capital
-            trade_capital = trade_size * capital / 100
+    # a big loss
+    significant_loss = (final_profits < 0) & (np.abs(final_profits) > initial_capital)
+    for trade_size in trade_sizes[significant_loss]:
+        print(f"Significant loss with trade size {trade_size}%")
 
-            profit = 0
-            in_position = False
-            entry_price = None
-
-            for _, row in data.iterrows():
-                signal = row['signal']
-                price = row['close']
-
-                if not in_position:
-                    # buy
-                    if signal == 1:
-                        entry_price = price
-                        in_position = True
-                # sell
-                else:
-                    # sell only if in position and there is roc sell signal coming
-                    if signal == -1:
-                        trade_return = (price - entry_price) / entry_price
-                        profit = profit + trade_capital * trade_return
-                        capital += profit
-                        trade_capital = trade_size * capital / 100
-                        # we sold everything
-                        in_position = False
-
-            if in_position:
-                # sell everything with the latest close price
-                trade_return = (data.iloc[-1]['close'] - entry_price) / entry_price
-                profit = profit + trade_capital * trade_return
-
-            # a big loss
-            if profit < 0 and abs(profit) > initial_capital:
-                print("Significant loss")
-            else:
-                profits.append(profit / initial_capital)
-                ratios.append(trade_size)
+    profits = final_profits[~significant_loss] / initial_capital
+    ratios = trade_sizes[~significant_loss]
 
     plt.figure(figsize=(10, 6))
     plt.plot(ratios, profits)
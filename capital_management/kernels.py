@@ -0,0 +1,177 @@
+import numpy as np
+
+from backtesting.profiling import stage
+from backtesting.tradelog import TradeLog
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, the NumPy/Python versions below are used without it
+    njit = None
+
+
+def reversal_trades(signals, prices):
+    """
+    Split a signal series into back-to-back trades, as in the SMA crossover system:
+    a trade is opened on the first bar and is closed (and the opposite one opened) on every signal change.
+    The last trade is closed on the last bar.
+    Returns entry indexes, exit indexes and trade returns, shorts for every signal other than 1.
+    """
+    signals = np.asarray(signals)
+    prices = np.asarray(prices, dtype=np.float64)
+
+    entry_index = np.r_[0, np.flatnonzero(signals[1:] != signals[:-1]) + 1]
+    exit_index = np.r_[entry_index[1:], len(signals) - 1]
+
+    entry_price = prices[entry_index]
+    exit_price = prices[exit_index]
+    returns = np.where(signals[entry_index] == 1,
+                       (exit_price - entry_price) / entry_price,
+                       (entry_price - exit_price) / entry_price)
+
+    return entry_index, exit_index, returns
+
+
+def long_only_trades(signals, prices):
+    """
+    Split a signal series into long trades: buy on a 1 when flat, sell on the next -1, zeros are ignored.
+    Returns entry indexes, exit indexes and returns of the closed trades,
+    plus the entry index of the trade still open at the end (or -1).
+    """
+    signals = np.asarray(signals)
+    prices = np.asarray(prices, dtype=np.float64)
+
+    # only the first bar of every run of non-zero signals changes the position
+    bars = np.flatnonzero(signals != 0)
+    values = signals[bars]
+    run_starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+
+    entry_index = bars[run_starts[values[run_starts] == 1]]
+    # a -1 run closes the position only if a 1 run came before it
+    exit_index = bars[run_starts[(values[run_starts] == -1) & (run_starts > 0)]]
+
+    open_index = -1
+    if len(entry_index) > len(exit_index):
+        open_index = entry_index[-1]
+        entry_index = entry_index[:-1]
+
+    returns = (prices[exit_index] - prices[entry_index]) / prices[entry_index]
+
+    return entry_index, exit_index, returns, open_index
+
+
+def _anti_martingale_sizes(returns, base_trade_size, factor):
+    """Trade sizes: the multiplier grows by factor after a win and is reset to 1 after a loss."""
+    sizes = np.empty(len(returns))
+    multiplier = 1.0
+    for i in range(len(returns)):
+        sizes[i] = base_trade_size * multiplier
+        if sizes[i] * returns[i] > 0:
+            multiplier *= factor
+        else:
+            multiplier = 1.0
+
+    return sizes
+
+
+def _anti_martingale_sizes_numpy(returns, base_trade_size, factor):
+    # the multiplier before a trade is factor ** (number of wins in a row right before it)
+    is_win = np.asarray(returns) > 0
+    trade_number = np.arange(1, len(returns) + 1)
+    last_loss = np.maximum.accumulate(np.where(is_win, 0, trade_number))
+    streak = np.r_[0, (trade_number - last_loss)[:-1]]
+
+    return base_trade_size * np.power(float(factor), streak)
+
+
+def _fixed_size_profits(returns, open_return, initial_capital, trade_size):
+    """
+    Running profit of the fixed-size system, with the accounting of fixed_size.py:
+    after every closed trade the running profit is credited to capital and the next trade uses trade_size % of it.
+    A trade still open at the end adds to the profit, not to the capital.
+    """
+    profits = np.empty(len(returns))
+    capital_after = np.empty(len(returns))
+
+    capital = initial_capital
+    trade_capital = trade_size * capital / 100
+    profit = 0.0
+    for i in range(len(returns)):
+        profits[i] = trade_capital * returns[i]
+        profit = profit + profits[i]
+        capital += profit
+        capital_after[i] = capital
+        trade_capital = trade_size * capital / 100
+
+    if not np.isnan(open_return):
+        profit = profit + trade_capital * open_return
+
+    return profits, capital_after, profit
+
+
+if njit is not None:
+    anti_martingale_sizes = njit(cache=True)(_anti_martingale_sizes)
+    fixed_size_profits = njit(cache=True)(_fixed_size_profits)
+else:
+    anti_martingale_sizes = _anti_martingale_sizes_numpy
+    fixed_size_profits = _fixed_size_profits
+
+
+@stage()
+def simulate_anti_martingale(signals, prices, initial_capital: float, base_trade_size: float, factor: float = 2):
+    """
+    Simulate the reversal system with anti-martingale sizing.
+    Returns the trades as a TradeLog and the equity curve (capital before the first and after every trade).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    entry_index, exit_index, returns = reversal_trades(signals, prices)
+
+    sizes = anti_martingale_sizes(returns, float(base_trade_size), float(factor))
+    profits = sizes * returns
+    equity_curve = np.cumsum(np.r_[float(initial_capital), profits])
+
+    trades = TradeLog.from_arrays(
+        entry_index=entry_index,
+        exit_index=exit_index,
+        entry_price=prices[entry_index],
+        exit_price=prices[exit_index],
+        side=np.asarray(signals)[entry_index],
+        size=sizes,
+        pnl=profits,
+        capital=equity_curve[1:],
+        **{'return': returns},
+    )
+
+    return trades, equity_curve
+
+
+@stage()
+def simulate_fixed_size(signals, prices, initial_capital: float, trade_size: float):
+    """
+    Simulate the long-only system that trades trade_size % of the capital.
+    Returns the closed trades as a TradeLog and the final running profit,
+    including the trade still open at the end (closed at the last price).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    entry_index, exit_index, returns, open_index = long_only_trades(signals, prices)
+
+    open_return = np.nan
+    if open_index >= 0:
+        open_return = (prices[-1] - prices[open_index]) / prices[open_index]
+
+    profits, capital_after, profit = fixed_size_profits(returns, open_return, float(initial_capital),
+                                                        float(trade_size))
+
+    # the trade capital is trade_size % of the capital before the trade
+    capital_before = np.r_[float(initial_capital), capital_after][:len(capital_after)]
+    trades = TradeLog.from_arrays(
+        entry_index=entry_index,
+        exit_index=exit_index,
+        entry_price=prices[entry_index],
+        exit_price=prices[exit_index],
+        size=float(trade_size) * capital_before / 100,
+        pnl=profits,
+        capital=capital_after,
+        **{'return': returns},
+    )
+
+    return trades, profit
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from backtesting import metrics
+from backtesting.profiling import stage
+from capital_management.sizing import anti_martingale_curves, fixed_size_curves
+
+RESAMPLERS = ('bootstrap', 'permutation')
+
+
+def bootstrap_returns(returns, n_paths: int, block_size: int = 1, n_trades: int = None, seed: int = 0):
+    """
+    Circular block bootstrap of trade returns: (n_paths x n_trades) matrix of blocks of block_size consecutive
+    trades, drawn with replacement, so streaks of wins and losses up to block_size trades long survive resampling.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_trades = n_trades or len(returns)
+    n_blocks = -(-n_trades // block_size)
+
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(len(returns), size=(n_paths, n_blocks, 1))
+    index = (starts + np.arange(block_size)).reshape(n_paths, -1)[:, :n_trades] % len(returns)
+
+    return returns[index]
+
+
+def permute_returns(returns, n_paths: int, seed: int = 0):
+    """(n_paths x n_trades) matrix of random orderings of the same trade returns."""
+    returns = np.asarray(returns, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+
+    return rng.permuted(np.broadcast_to(returns, (n_paths, len(returns))), axis=1)
+
+
+def anti_martingale_paths(returns, initial_capital: float, base_trade_size: float, factor: float = 2):
+    """
+    Equity paths of the anti-martingale sizing of kernels.simulate_anti_martingale for every row of returns at once.
+    Returns a (n_paths x n_trades + 1) matrix, the capital before the first and after every trade.
+    """
+    return anti_martingale_curves(returns, initial_capital, base_trade_size, factor)
+
+
+def fixed_size_paths(returns, initial_capital: float, trade_size: float):
+    """
+    Capital paths of the fixed-size system of kernels.simulate_fixed_size for every row of returns at once.
+    Returns a (n_paths x n_trades + 1) matrix, the capital before the first and after every trade.
+    """
+    return fixed_size_curves(returns, trade_size, initial_capital)[0]
+
+
+POLICIES = {
+    'anti_martingale': anti_martingale_paths,
+    'fixed_size': fixed_size_paths,
+}
+
+
+@stage()
+def monte_carlo(returns, policy: str, n_paths: int = 10_000, method: str = 'bootstrap', block_size: int = 1,
+                ruin_level: float = 0.5, seed: int = 0, **policy_args):
+    """
+    Resample the trade returns into n_paths paths (`bootstrap` or `permutation`) and run them all through
+    a sizing policy of POLICIES at once. A path is ruined once its capital falls to ruin_level of the initial one.
+    Returns one row per path: final capital, total return, max drawdown and whether it was ruined,
+    and the (n_paths x n_trades + 1) equity matrix.
+    """
+    if method == 'bootstrap':
+        paths = bootstrap_returns(returns, n_paths, block_size, seed=seed)
+    elif method == 'permutation':
+        paths = permute_returns(returns, n_paths, seed)
+    else:
+        raise ValueError(f"unknown resampling method {method}, expected one of {RESAMPLERS}")
+
+    equity = POLICIES[policy](paths, **policy_args)
+    initial_capital = equity[0, 0]
+
+    results = pd.DataFrame({
+        'final_capital': equity[:, -1],
+        'total_return': equity[:, -1] / initial_capital - 1,
+        'max_drawdown': metrics.max_drawdown(equity),
+        'ruined': equity.min(axis=1) <= ruin_level * initial_capital,
+    })
+
+    return results, equity
+
+
+def summary(results, percentiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Distribution of the per-path results: percentiles of every column and the probability of ruin."""
+    table = results[['final_capital', 'total_return', 'max_drawdown']].quantile(list(percentiles))
+    table.index = [f"{p:.0%}" for p in percentiles]
+
+    return table, float(results['ruined'].mean())
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from backtesting import metrics
+from backtesting.profiling import stage
+from capital_management.kernels import long_only_trades, reversal_trades
+
+
+def _broadcast(returns, *params):
+    """Returns as (n_rows x n_trades) and every parameter as a column, n_rows of the rows and parameters together."""
+    returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    params = [np.asarray(param, dtype=np.float64).reshape(-1, 1) for param in params]
+    n_rows = np.broadcast_shapes(returns.shape[:1], *[param.shape[:1] for param in params])[0]
+
+    return np.broadcast_to(returns, (n_rows, returns.shape[1])), params
+
+
+def fixed_size_curves(returns, trade_size, initial_capital: float, open_return: float = np.nan):
+    """
+    Capital curves of the fixed-size system of kernels.simulate_fixed_size, with its accounting: after every trade
+    the running profit is credited to capital, and the next trade uses trade_size % of it.
+    returns (one row, or one row per curve) and trade_size (a number or one per curve) are broadcast together;
+    the recurrence is stepped trade by trade, every step is vectorized over the curves.
+    Returns the (n_curves x n_trades + 1) capital curves and the final running profit of every curve,
+    including the trade still open at the end (open_return).
+    """
+    returns, (trade_size,) = _broadcast(returns, trade_size)
+    trade_size = trade_size[:, 0]
+
+    capital = np.full(len(returns), float(initial_capital))
+    profit = np.zeros(len(returns))
+    equity = np.empty((len(returns), returns.shape[1] + 1))
+    equity[:, 0] = capital
+
+    for i in range(returns.shape[1]):
+        profit = profit + trade_size * capital / 100 * returns[:, i]
+        capital = capital + profit
+        equity[:, i + 1] = capital
+
+    if not np.isnan(open_return):
+        profit = profit + trade_size * capital / 100 * open_return
+
+    return equity, profit
+
+
+def anti_martingale_curves(returns, initial_capital: float, base_trade_size, factor=2):
+    """
+    Equity curves of the anti-martingale sizing of kernels.simulate_anti_martingale: the trade size is multiplied
+    by factor after a win and reset after a loss. returns, base_trade_size and factor are broadcast per curve.
+    Returns a (n_curves x n_trades + 1) matrix, the capital before the first and after every trade.
+    """
+    returns, (base_trade_size, factor) = _broadcast(returns, base_trade_size, factor)
+
+    # the multiplier before a trade is factor ** (number of wins in a row right before it)
+    trade_number = np.arange(1, returns.shape[1] + 1)
+    last_loss = np.maximum.accumulate(np.where(returns > 0, 0, trade_number), axis=1)
+    streak = np.zeros(returns.shape)
+    streak[:, 1:] = (trade_number - last_loss)[:, :-1]
+
+    equity = np.empty((len(returns), returns.shape[1] + 1))
+    equity[:, 0] = initial_capital
+    equity[:, 1:] = base_trade_size * np.power(factor, streak) * returns
+    np.cumsum(equity, axis=1, out=equity)
+
+    return equity
+
+
+def kelly_fraction(returns):
+    """Kelly fraction of the trade returns, win rate - loss rate / (average win / average loss), 0 if negative."""
+    returns = np.asarray(returns, dtype=np.float64)
+    wins, losses = returns[returns > 0], returns[returns <= 0]
+    if not len(wins):
+        return 0.0
+    if not len(losses) or not losses.mean():
+        return 1.0
+
+    win_rate = float(metrics.win_rate(returns))
+    payoff = wins.mean() / -losses.mean()
+
+    return max(win_rate - (1 - win_rate) / payoff, 0.0)
+
+
+def fraction_curves(returns, fraction, initial_capital: float):
+    """Compounding equity curves: every trade risks `fraction` of the current capital, fractions broadcast per curve."""
+    returns, (fraction,) = _broadcast(returns, fraction)
+
+    growth = np.ones((len(returns), returns.shape[1] + 1))
+    growth[:, 1:] += fraction * returns
+
+    return initial_capital * np.cumprod(growth, axis=1)
+
+
+@stage()
+def sizing_sweep(signals, prices, initial_capital: float, trade_sizes=(), base_trade_sizes=(),
+                 kelly_multipliers=(), fractions=(), factor: float = 2):
+    """
+    Apply many sizing policies to the same trades in one pass: the trades are taken from the signals once,
+    every policy is one row of a broadcast (n_policies x n_trades) computation.
+      trade_sizes: % of capital of the fixed-size system, on its long-only trades (fixed_size.py)
+      base_trade_sizes: first trade size of the anti-martingale doubling, on the reversal trades (anti_martingale.py)
+      kelly_multipliers: shares of the Kelly fraction of the long-only trades (1 full Kelly, 0.5 half Kelly, ...)
+      fractions: fixed fractions of the current capital, compounding, on the long-only trades
+    Returns one row per policy (policy, value, final capital and profit, total return, max drawdown) and the
+    equity curves of the long-only and the reversal policies (they have different numbers of trades).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    _, _, returns, open_index = long_only_trades(signals, prices)
+    open_return = np.nan
+    if open_index >= 0:
+        open_return = (prices[-1] - prices[open_index]) / prices[open_index]
+
+    kelly = kelly_fraction(returns)
+    kelly_multipliers = np.asarray(kelly_multipliers, dtype=np.float64)
+
+    rows, long_only, reversal = [], [], []
+
+    if len(trade_sizes):
+        equity, profit = fixed_size_curves(returns, trade_sizes, initial_capital, open_return)
+        rows.append(pd.DataFrame({'policy': 'fixed_size', 'value': trade_sizes, 'final_profit': profit}))
+        long_only.append(equity)
+
+    if len(kelly_multipliers) or len(fractions):
+        values = np.r_[kelly_multipliers * kelly, fractions]
+        equity = fraction_curves(returns, values, initial_capital)
+        rows.append(pd.DataFrame({
+            'policy': ['kelly'] * len(kelly_multipliers) + ['fraction'] * len(fractions),
+            'value': np.r_[kelly_multipliers, fractions],
+            'final_profit': equity[:, -1] - initial_capital,
+        }))
+        long_only.append(equity)
+
+    if len(base_trade_sizes):
+        _, _, reversal_returns = reversal_trades(signals, prices)
+        equity = anti_martingale_curves(reversal_returns, initial_capital, base_trade_sizes, factor)
+        rows.append(pd.DataFrame({'policy': 'anti_martingale', 'value': base_trade_sizes,
+                                  'final_profit': equity[:, -1] - initial_capital}))
+        reversal.append(equity)
+
+    long_only = np.vstack(long_only) if long_only else np.empty((0, len(returns) + 1))
+    reversal = np.vstack(reversal) if reversal else np.empty((0, 0))
+
+    table = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=['policy', 'value', 'final_profit'])
+    curves = [curve for curve in (long_only, reversal) if len(curve)]
+    table['final_capital'] = np.concatenate([curve[:, -1] for curve in curves]) if curves else []
+    table['total_return'] = np.concatenate([metrics.total_return(curve) for curve in curves]) if curves else []
+    table['max_drawdown'] = np.concatenate([metrics.max_drawdown(curve) for curve in curves]) if curves else []
+
+    return table, long_only, reversal
@@ -1,52 +1,48 @@
-import ta
-import csv
-import pandas as pd
-from datetime import datetime
-import plotly.graph_objects as go
-
-historical_data = []
+import sys
 
-with open('./resources/AAPL.csv', 'r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        timestamp = row['datetime'].split(" ")[0]
-        timestamp = datetime.strptime(timestamp, '%Y-%m-%d')  # skip time
+import plotly.graph_objects as go
 
-        if timestamp > datetime.fromisoformat('1999-01-01'):
-            historical_data.append({
-                'timestamp': timestamp,
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': float(row['volume'])
-            })
+from backtesting.charts import decimate_line, render
+from backtesting.data import read_resampled
+from backtesting.indicators import rsi, sma_matrix
+from backtesting.signals import col, evaluate_rules
 
-data = pd.DataFrame(historical_data)
-data.set_index('timestamp', inplace=True)
+# daily bars, intraday files are aggregated per day
+data = read_resampled('./resources/AAPL.csv', 'D', start_date='1999-01-02')
 
-data['RSI'] = ta.momentum.RSIIndicator(data['close'], window=14).rsi()
+data['RSI'] = rsi(data['close'].to_numpy(), window=14)
 
 # narrow the time period
 data = data.loc['2022-01-01':'2025-01-31']
 
-data['SMA_50'] = ta.trend.sma_indicator(data['close'], window=50)
-data['SMA_200'] = ta.trend.sma_indicator(data['close'], window=200)
+data['SMA_50'], data['SMA_200'] = sma_matrix(data['close'].to_numpy(), [50, 200]).T
 
-data['Buy_Signal'] = (data['RSI'] < 30) & (data['SMA_50'] > data['SMA_200'])  # Oversold and SMA crossover
-data['Sell_Signal'] = (data['RSI'] > 70) & (data['SMA_50'] < data['SMA_200'])  # Overbought and SMA crossover
+# both rules in one pass, the RSI and SMA columns they share are read once
+rsi_14, sma_50, sma_200 = col('RSI'), col('SMA_50'), col('SMA_200')
+signals = evaluate_rules(data, {
+    'Buy_Signal': (rsi_14 < 30) & (sma_50 > sma_200),  # Oversold and SMA crossover
+    'Sell_Signal': (rsi_14 > 70) & (sma_50 < sma_200),  # Overbought and SMA crossover
+})
+data['Buy_Signal'] = signals['Buy_Signal'].astype(bool)
+data['Sell_Signal'] = signals['Sell_Signal'].astype(bool)
 
 fig = go.Figure()
 
+# the lines are cut down to the chart width (LTTB), the signals are drawn as they are
+lines = {col: decimate_line(data.index, data[col]) for col in ['close', 'SMA_50', 'SMA_200', 'RSI']}
+
 # Plot closing price
 fig.add_trace(
-    go.Scatter(x=data.index, y=data['close'], mode='lines', name='Close Price', line=dict(color='blue', width=2)))
+    go.Scatter(x=lines['close'][0], y=lines['close'][1], mode='lines', name='Close Price',
+               line=dict(color='blue', width=2)))
 
 # Plot SMAs
 fig.add_trace(
-    go.Scatter(x=data.index, y=data['SMA_50'], mode='lines', name='SMA 50', line=dict(color='orange', width=2)))
+    go.Scatter(x=lines['SMA_50'][0], y=lines['SMA_50'][1], mode='lines', name='SMA 50',
+               line=dict(color='orange', width=2)))
 fig.add_trace(
-    go.Scatter(x=data.index, y=data['SMA_200'], mode='lines', name='SMA 200', line=dict(color='green', width=2)))
+    go.Scatter(x=lines['SMA_200'][0], y=lines['SMA_200'][1], mode='lines', name='SMA 200',
+               line=dict(color='green', width=2)))
 
 # Plot Buy Signals (green triangles)
 fig.add_trace(go.Scatter(x=data.index[data['Buy_Signal']],
@@ -63,12 +59,14 @@ fig.add_trace(go.Scatter(x=data.index[data['Sell_Signal']],
                          marker=dict(symbol='triangle-down', color='red', size=10)))
 
 # Plot RSI chart
-fig.add_trace(go.Scatter(x=data.index, y=data['RSI'], mode='lines', name='RSI', line=dict(color='purple', width=2)))
+fig.add_trace(go.Scatter(x=lines['RSI'][0], y=lines['RSI'][1], mode='lines', name='RSI',
+                         line=dict(color='purple', width=2)))
 
-# Add overbought (70) and oversold (30) horizontal lines to the RSI chart
-fig.add_trace(go.Scatter(x=data.index, y=[70] * len(data), mode='lines', name='Overbought (70)',
+# Add overbought (70) and oversold (30) horizontal lines to the RSI chart, a straight line needs only its ends
+period = data.index[[0, -1]]
+fig.add_trace(go.Scatter(x=period, y=[70, 70], mode='lines', name='Overbought (70)',
                          line=dict(color='red', dash='dash')))
-fig.add_trace(go.Scatter(x=data.index, y=[30] * len(data), mode='lines', name='Oversold (30)',
+fig.add_trace(go.Scatter(x=period, y=[30, 30], mode='lines', name='Oversold (30)',
                          line=dict(color='green', dash='dash')))
 
 fig.update_layout(
@@ -79,4 +77,5 @@ fig.update_layout(
     showlegend=True
 )
 
-fig.show()
+# python matplotlib_backtesting_example.py chart.html writes the chart instead of opening it
+render(fig, sys.argv[1] if len(sys.argv) > 1 else None)
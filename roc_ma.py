@@ -1,91 +1,92 @@
-import csv
+import importlib
+import os
+import sys
 
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from ta.momentum import ROCIndicator
-from ta.trend import sma_indicator
-
-
-def parseData(file_name: str, start_date: str):
-    """Parse CSV data and filter by start_date."""
-    historical_data = []
-
-    with open(file_name, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            timestamp = row['datetime'].split(" ")[0]
-            timestamp = datetime.strptime(timestamp, '%Y-%m-%d')  # skip time
-
-            historical_data.append({
-                'timestamp': timestamp,
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': float(row['volume'])
-            })
-
-    data = pd.DataFrame(historical_data)
-    data.set_index('timestamp', inplace=True)
-    data['date'] = data.index
 
-    return data
+from backtesting.charts import MAX_POINTS, decimate_candles, decimate_line, render
+from backtesting.data import load_dataset
+from backtesting.engine import match_trade_log, run_lengths, sell_profits, trade_statistics
+from backtesting.indicators import cached_indicator, roc_matrix, rolling_mean
+from backtesting.profiling import stage
+from backtesting.signals import col, evaluate_signal, sign
+from backtesting.store import ResultStore, code_version, stored_sweep
+from backtesting.sweep import iter_sweep, run_sweep
+
+# the modules that decide the stats of a run, besides this one: an edit to any of them invalidates stored results
+STATS_MODULES = ['backtesting.data', 'backtesting.resample', 'backtesting.indicators', 'backtesting.signals',
+                 'backtesting.engine', 'backtesting.tradelog']
+
 
+@stage()
+def parseData(file_name: str, start_date: str, end_date: str = None, timeframe: str = 'D'):
+    """Parse CSV data into bars of the timeframe (daily by default) and filter by start_date and end_date."""
+    return load_dataset(file_name, start_date, end_date, timeframe)
 
-def get_smoothed_roc_indicator(data, roc_window: int, sma_window: int):
-    """Add the Rate-of-Change (ROC) indicator column."""
-    data['roc'] = ROCIndicator(data['close'], window=roc_window).roc()
-    data['roc'] = sma_indicator(data['roc'], window=sma_window)
+
+@stage()
+def get_smoothed_roc_indicator(data, roc_window: int, sma_window: int, roc_windows: tuple = None):
+    """
+    Add the Rate-of-Change (ROC) indicator column, smoothed with SMA.
+    ROC is computed for all of roc_windows (just roc_window by default) in one pass;
+    both matrices are cached per dataset, so the other windows are free for the next calls.
+    """
+    roc_windows = tuple(roc_windows or (roc_window,))
+    roc = cached_indicator(data, 'roc', roc_windows,
+                           lambda: roc_matrix(data['close'].to_numpy(), roc_windows))
+    smoothed_roc = cached_indicator(data, 'sma_roc', (roc_windows, sma_window),
+                                    lambda: rolling_mean(roc, sma_window))
+
+    data['roc'] = smoothed_roc[:, roc_windows.index(roc_window)]
 
     return data
 
 
+@stage()
 def prepare_buy_sell_signals(data):
     """Assign a trading signal based on the sign of the ROC value."""
-    data['signal'] = 0
-    data['signal'][data['roc'] > 0] = 1
-    data['signal'][data['roc'] < 0] = -1
+    # a shallow copy: the frame may be a slice, the column is added to the copy without chained assignment
+    data = data.copy(deep=False)
+    data['signal'] = evaluate_signal(data, sign(col('roc')))
 
     return data
 
 
-def prepare_buy_sell_actions(data, exit):
+@stage()
+def prepare_buy_sell_actions(data, exit, entry: int = 2):
     """
-    Group consecutive signals and assign an action when the group lasts for more than 2 bars.
-    The trade is executed 2 days after the signal.
+    Group consecutive signals and assign an action when the group lasts for more than entry bars.
+    The trade is executed entry days after the signal.
     The sell happens after exit amount of bars.
     """
-    data['group'] = (data['signal'] != data['signal'].shift(1)).cumsum()
+    starts, lengths, signals = run_lengths(data['signal'].to_numpy())
 
-    grouped_data = data.groupby(['group', 'signal']).agg(
-        timestamp=('date', 'first'),
-        count=('signal', 'size')
-    ).reset_index()
+    # the action is set on the first bar of the run
+    action = np.full(len(data), -1, dtype=object)
+    action[starts[(lengths > entry) & (signals == 1)]] = 'buy'
+    action[starts[(lengths > exit) & (signals == -1)]] = 'sell'
 
-    grouped_data['action'] = pd.NA
-    grouped_data.loc[(grouped_data['count'] > 2) & (grouped_data['signal'] == 1), 'action'] = 'buy'
-    grouped_data.loc[(grouped_data['count'] > exit) & (grouped_data['signal'] == -1), 'action'] = 'sell'
+    # a shallow copy: the new columns are added without copying the existing ones
+    data = data.copy(deep=False)
+    data['group'] = np.repeat(np.arange(1, len(starts) + 1), lengths)
+    data['action'] = action
+    data['action_timestamp'] = data['date'].shift(-exit)
 
-    grouped_data_to_merge = pd.DataFrame(grouped_data.to_dict(orient='records'))
-
-    data = pd.merge(
-        data,
-        grouped_data_to_merge[['timestamp', 'action']],
-        on='timestamp',
-        how='left'
-    )
-    data['action'] = data['action'].fillna(-1)
-
-    data['action_timestamp'] = pd.NA
-    data.loc[(data['action'] != pd.NA), 'action_timestamp'] = data['date'].shift(-exit)
+    data.insert(0, data.index.name, data.index)
+    data.index = pd.RangeIndex(len(data))
 
     return data
 
 
 # (Optional) Chart function remains available if you wish to visualize any specific run
-def show_charts(data):
+def show_charts(data, path: str = None, max_points: int = MAX_POINTS):
+    """
+    Candles, buy/sell markers and the ROC of a run. The candles and the ROC line are decimated to max_points,
+    with a path the chart is written to a file (.html or an image) instead of being shown.
+    """
     buy_signals = data[data['action'] == 'buy']
     sell_signals = data[data['action'] == 'sell']
 
@@ -101,17 +102,18 @@ def show_charts(data):
         row_heights=[0.7, 0.3]
     )
 
+    candles = decimate_candles(data.set_index('date'), max_points)
     fig.add_trace(go.Candlestick(
-        x=data['action_timestamp'],
-        open=data['open'],
-        high=data['high'],
-        low=data['low'],
-        close=data['close'],
+        x=candles.index,
+        open=candles['open'],
+        high=candles['high'],
+        low=candles['low'],
+        close=candles['close'],
         name='Close Price'
     ), row=1, col=1)
 
     fig.add_trace(go.Scatter(
-        x=buy_signals['action_timestamp'],
+        x=buy_signals['date'],
         y=buy_signals['low'] - 10,  # Place buy marker slightly below the low of the candle for better observability
         mode='markers',
         marker=dict(symbol='triangle-up', color='green', size=15),
@@ -119,16 +121,17 @@ def show_charts(data):
     ), row=1, col=1)
 
     fig.add_trace(go.Scatter(
-        x=sell_signals['action_timestamp'],
+        x=sell_signals['date'],
         y=sell_signals['low'] - 10,  # Place buy marker slightly below the low of the candle
         mode='markers',
         marker=dict(symbol='triangle-up', color='red', size=15),
         name='Sell Signal'
     ), row=1, col=1)
 
+    dates, roc = decimate_line(data['date'], data['roc'], max_points)
     fig.add_trace(go.Scatter(
-        x=data['date'],
-        y=data['roc'],
+        x=dates,
+        y=roc,
         mode='lines',
         name='ROC',
         line=dict(color='black', width=2)
@@ -146,82 +149,18 @@ def show_charts(data):
     fig.update_yaxes(title_text="Price", row=1, col=1)
     fig.update_yaxes(title_text="ROC (%)", row=2, col=1)
 
-    fig.show()
+    render(fig, path)
 
 
+@stage()
 def calculate_statistics(data):
-    buy_prices = []
-    sell_prices = []
-    trades = []
-    total_profit = 0
-
-    is_open_position = False
-
-    for index, row in data.iterrows():
-        if row['action'] == 'buy':
-            buy_price = row['close']
-            buy_prices.append(buy_price)
-
-            trades.append(
-                {
-                    'action': 'buy',
-                    'timestamp': row['action_timestamp'],
-                    'price': buy_price,
-                    'status': 'OPEN'
-                }
-            )
-            is_open_position = True
-        elif row['action'] == 'sell' and is_open_position:
-            sell_price = row['close']
-            sell_prices.append(sell_price)
-
-            profit = 0
-            for trade in trades:
-                if trade['status'] == 'OPEN':
-                    trade_profit = (sell_price - trade['price'])
-                    profit += trade_profit
-                    trade['status'] = 'CLOSED'
-
-            trades.append(
-                {
-                    'action': 'sell',
-                    'timestamp': row['action_timestamp'],
-                    'price': sell_price,
-                    'profit': profit,
-                    'status': 'CLOSED_ALL'
-                }
-            )
-            total_profit += profit
-            is_open_position = False
-
-    buy_orders = [trade for trade in trades if trade['action'] == 'buy']
-    sell_orders = [trade for trade in trades if trade['action'] == 'sell']
-
-    win_trades = [trade for trade in trades if 'profit' in trade and trade['profit'] > 0]
-    loss_trades = [trade for trade in trades if 'profit' in trade and trade['profit'] <= 0]
-
-    total_trades = len(buy_orders + sell_orders)
-
-    win_rate = (len(win_trades) / len(win_trades + loss_trades)) * 100
-    average_profit = total_profit / len([trade for trade in trades if 'profit' in trade])
-
-    win_loss_ration = len(win_trades) / len(loss_trades) if loss_trades else 0
+    actions = data['action'].to_numpy()
+    trades = match_trade_log(actions == 'buy', actions == 'sell', data['close'].to_numpy())
+    sell_index, profits = sell_profits(trades)
 
     # todo: use this to round all the floats inside the DF
     # df_rounded = df.round(2)
-    stats = {
-        'total_profit': total_profit,
-        'total_trades': total_trades,
-        'win_rate': win_rate,
-        'win_loss_ratio': format(win_loss_ration, ".2f"),
-        'average_profit': average_profit,
-        'wins': len(win_trades),
-        'losses': len(loss_trades),
-        'buy_orders': len(buy_orders),
-        'sell_orders': len(sell_orders),
-    }
-
-    return stats
+    return trade_statistics(len(trades), len(sell_index), profits)
 
 
 def print_stats(stats: dict):
@@ -238,8 +177,9 @@ def print_stats(stats: dict):
 
 
 def backtest_single_run(stock_data_file_name: str, roc_window: int, sma_window: int, exit: int, start_date: str,
-                        end_date: str):
-    data = parseData(stock_data_file_name, start_date)
+                        end_date: str, chart_path: str = None, timeframe: str = 'D'):
+    # keep the history before start_date to warm up the indicators
+    data = parseData(stock_data_file_name, None, end_date, timeframe)
     data = get_smoothed_roc_indicator(data, roc_window, sma_window)
     data = data.loc[start_date:end_date]
     data = prepare_buy_sell_signals(data)
@@ -248,27 +188,102 @@ def backtest_single_run(stock_data_file_name: str, roc_window: int, sma_window:
     stats = calculate_statistics(data)
     print_stats(stats)
 
-    show_charts(data)
+    show_charts(data, chart_path)
+
+
+def chart_cell(data, roc_window: int, sma_window: int, exit: int, start_date: str, end_date: str, path: str,
+               max_points: int = MAX_POINTS):
+    """Write the chart of one run to path, the sweep evaluate function of render_charts."""
+    data = get_smoothed_roc_indicator(data, roc_window, sma_window)
+    data = data.loc[start_date:end_date]
+    data = prepare_buy_sell_signals(data)
+    show_charts(prepare_buy_sell_actions(data, exit), path, max_points)
+
+    return path
+
 
+def render_charts(stock_data_file_name: str, table, start_date: str, end_date: str, directory: str,
+                  workers: int = None, extension: str = 'html', max_points: int = MAX_POINTS):
+    """
+    Write the chart of every row (roc_window, sma_window, exit) of a backtest table into directory,
+    in parallel on `workers` processes over the shared dataset. Returns the file paths.
+    """
+    dataset = parseData(stock_data_file_name, None, end_date)
+    ticker = os.path.splitext(os.path.basename(stock_data_file_name))[0]
+
+    grid = [
+        (int(row.roc_window), int(row.sma_window), int(row.exit), start_date, end_date,
+         os.path.join(directory, f"{ticker}_roc{row.roc_window}_sma{row.sma_window}_exit{row.exit}.{extension}"),
+         max_points)
+        for row in table[['roc_window', 'sma_window', 'exit']].drop_duplicates().itertuples()
+    ]
+
+    return run_sweep(chart_cell, dataset, grid, workers)
+
+
+@stage()
+def backtest_grid_cell(data, roc_window: int, sma_window: int, exits: list, start_date: str, end_date: str,
+                       roc_windows: tuple = None, entry: int = 2, skip_empty: bool = False):
+    """
+    Run the grid cells of one (roc_window, sma_window) pair, one per exit, and return their stats.
+    The indicator and the signals don't depend on the exit, they are computed once for all of them.
+    With skip_empty, the exits without a closed trade are left out instead of raising ZeroDivisionError.
+    """
+    data = get_smoothed_roc_indicator(data, roc_window, sma_window, roc_windows)
+    data = data.loc[start_date:end_date]
+    data = prepare_buy_sell_signals(data)
 
-def backtest(stock_data_file_name: str, start_date: str, end_date: str):
     results = []
-    for roc_window in range(10, 31):  # ROC Window
-        for sma_window in [100, 250]:  # SMA Window
-            for exit in [5, 10, 15, 20]:  # Exit
-                data = parseData(stock_data_file_name, start_date)
-                data = get_smoothed_roc_indicator(data, roc_window, sma_window)
-                data = data.loc[start_date:end_date]
-                data = prepare_buy_sell_signals(data)
-                data = prepare_buy_sell_actions(data, exit)
-
-                stats = calculate_statistics(data)
-                stats['roc_window'] = roc_window
-                stats['sma_window'] = sma_window
-                stats['exit'] = exit
-
-                if stats['total_trades'] >= 30:
-                    results.append(stats)
+    for exit in exits:
+        try:
+            stats = calculate_statistics(prepare_buy_sell_actions(data, exit, entry))
+        except ZeroDivisionError:
+            if not skip_empty:
+                raise
+            continue
+        stats['roc_window'] = roc_window
+        stats['sma_window'] = sma_window
+        stats['exit'] = exit
+        results.append(stats)
+
+    return results
+
+
+def backtest(stock_data_file_name: str, start_date: str, end_date: str, workers: int = None,
+             store: ResultStore = None, timeframe: str = 'D'):
+    """
+    Sweep the ROC grid on bars of the timeframe and print the results with at least 30 trades.
+    With a store, every grid cell is saved as soon as it is done, and the cells already stored for the same
+    file content and code are not recomputed.
+    """
+    # parse the file once, every grid cell works on a shallow copy of it;
+    # the history before start_date is kept to warm up the indicators
+    dataset = parseData(stock_data_file_name, None, end_date, timeframe)
+
+    roc_windows = tuple(range(10, 31))  # ROC Window
+    exits = [5, 10, 15, 20]  # Exit
+    grid = [
+        (roc_window, sma_window, exits, start_date, end_date, roc_windows)
+        for roc_window in roc_windows
+        for sma_window in [100, 250]  # SMA Window
+    ]
+
+    # the grid cells are independent, they run in parallel on `workers` processes (all CPUs by default)
+    if store is None:
+        all_stats = [stats for cell_results in run_sweep(backtest_grid_cell, dataset, grid, workers)
+                     for stats in cell_results]
+    else:
+        keys = [
+            [{'roc_window': roc_window, 'sma_window': sma_window, 'exit': exit,
+              'start_date': start_date, 'end_date': end_date, 'timeframe': timeframe} for exit in exits]
+            for roc_window, sma_window, *_ in grid
+        ]
+        version = code_version(sys.modules[__name__], *[importlib.import_module(name) for name in STATS_MODULES])
+        stored = stored_sweep(store, stock_data_file_name, 'roc_ma', version, list(zip(grid, keys)),
+                              lambda cells: iter_sweep(backtest_grid_cell, dataset, cells, workers))
+        all_stats = [stats for _, stats in stored]
+
+    results = [stats for stats in all_stats if stats['total_trades'] >= 30]
 
     if not results:
         print("No results with more than 30 trades")
@@ -314,7 +329,17 @@ if __name__ == "__main__":
     # start_date = '2018-01-01'
     # end_date = '2024-08-31'
 
+    # TO RE-OPTIMIZE ON ROLLING WINDOWS (5 years to fit, the next year to check), see backtesting/walkforward.py
+    # folds = walk_forward(stock_data_file_name, start_date='2000-01-01', end_date=end_date)
+
     # result = backtest(stock_data_file_name, start_date, end_date)
+    # to keep the results and skip the cells already computed on a rerun:
+    # with ResultStore('results.sqlite') as store:
+    #     result = backtest(stock_data_file_name, start_date, end_date, store=store)
+    # the same grid on weekly bars, intraday files are aggregated once per timeframe and kept in memory:
+    # result = backtest(stock_data_file_name, start_date, end_date, timeframe='W')
+    # to write the chart of every result into ./charts without opening a browser:
+    # render_charts(stock_data_file_name, result, start_date, end_date, './charts')
 
     # Optional:
     # if you need to check single result with defined parameters and chars
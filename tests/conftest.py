@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# the scripts run from the repository root, the tests import them the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtesting.benchmark import synthetic_ohlcv, write_csv  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def daily_csv(tmp_path_factory):
+    """About 11 years of random-walk daily bars."""
+    file_name = str(tmp_path_factory.mktemp('daily') / 'DAILY.csv')
+    write_csv(synthetic_ohlcv(4_000, seed=1), file_name)
+
+    return file_name
+
+
+@pytest.fixture(scope='session')
+def hourly_csv(tmp_path_factory):
+    """About 3 years of random-walk hourly bars, 24 a day."""
+    data = synthetic_ohlcv(25_000, seed=2)
+    data.index = pd.date_range('2000-01-03', periods=len(data), freq='h', name='timestamp')
+
+    file_name = str(tmp_path_factory.mktemp('hourly') / 'HOURLY.csv')
+    write_csv(data, file_name)
+
+    return file_name
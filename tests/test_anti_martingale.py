@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from capital_management.kernels import simulate_anti_martingale
+
+
+def original_simulation(data, initial_capital, base_trade_size):
+    """The trade loop of anti_martingale.main as it was first written, returns the trade details and equity curve."""
+    capital = initial_capital
+    position_multiplier = 1
+    equity_curve = [capital]
+    trade_details = []
+
+    in_position = False
+    entry_price = None
+    entry_signal = None
+
+    for _, row in data.iterrows():
+        signal = row['Signal']
+        price = row['close']
+
+        if not in_position:
+            in_position = True
+            entry_signal = signal
+            entry_price = price
+        else:
+            if signal != entry_signal:
+                exit_price = price
+                if entry_signal == 1:
+                    trade_return = (exit_price - entry_price) / entry_price
+                else:
+                    trade_return = (entry_price - exit_price) / entry_price
+
+                trade_size = base_trade_size * position_multiplier
+                profit = trade_size * trade_return
+                capital += profit
+                trade_details.append((entry_price, exit_price, entry_signal, trade_return, profit, trade_size, capital))
+                equity_curve.append(capital)
+
+                if profit > 0:
+                    position_multiplier *= 2
+                else:
+                    position_multiplier = 1
+
+                in_position = True
+                entry_signal = signal
+                entry_price = price
+
+    # the trade still open at the end is closed at the last price
+    if in_position:
+        exit_price = data.iloc[-1]['close']
+        if entry_signal == 1:
+            trade_return = (exit_price - entry_price) / entry_price
+        else:
+            trade_return = (entry_price - exit_price) / entry_price
+
+        trade_size = base_trade_size * position_multiplier
+        profit = trade_size * trade_return
+        capital += profit
+        trade_details.append((entry_price, exit_price, entry_signal, trade_return, profit, trade_size, capital))
+        equity_curve.append(capital)
+
+    columns = ['entry_price', 'exit_price', 'side', 'return', 'pnl', 'size', 'capital']
+    return pd.DataFrame(trade_details, columns=columns), np.array(equity_curve)
+
+
+def crossover_signals(seed, n_bars=300):
+    """Signs of an SMA 5 / SMA 15 crossover of a random walk, NaN bars dropped like anti_martingale.py does."""
+    rng = np.random.default_rng(seed)
+    close = pd.Series(np.round(100 * np.exp(rng.normal(0, 0.02, n_bars).cumsum()), 2))
+    fast, slow = close.rolling(5).mean(), close.rolling(15).mean()
+    signal = np.where(fast > slow, 1, np.where(fast < slow, -1, 0))
+
+    return pd.DataFrame({'Signal': signal, 'close': close})[slow.notna()].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_matches_the_original_loop(seed):
+    data = crossover_signals(seed)
+    expected, expected_equity = original_simulation(data, 1_000_000, 10_000)
+
+    trades, equity = simulate_anti_martingale(data['Signal'].to_numpy(), data['close'].to_numpy(), 1_000_000, 10_000)
+
+    assert len(trades) == len(expected) > 1
+    for column in expected:
+        assert (trades[column] == expected[column].to_numpy()).all(), column
+    assert (equity == expected_equity).all()
+
+
+def test_last_open_trade_is_closed_on_the_last_bar():
+    data = pd.DataFrame({'Signal': [1, 1, -1, -1, -1, 1], 'close': [10.0, 11.0, 12.0, 11.0, 10.0, 10.5]})
+    expected, expected_equity = original_simulation(data, 1_000, 100)
+
+    trades, equity = simulate_anti_martingale(data['Signal'].to_numpy(), data['close'].to_numpy(), 1_000, 100)
+
+    # the last bar opens a long that is closed on the same bar, for a zero profit
+    assert trades['exit_index'].tolist() == [2, 5, 5]
+    for column in expected:
+        assert (trades[column] == expected[column].to_numpy()).all(), column
+    assert (equity == expected_equity).all()
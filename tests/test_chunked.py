@@ -0,0 +1,34 @@
+import itertools
+
+import pytest
+
+import roc_ma
+from backtesting.chunked import backtest_chunked
+
+PARAMS = [(10, 20, 5), (21, 100, 10)]
+CHUNK_SIZES = [37, 1_000, 100_000]
+
+
+def single_run_stats(file_name, roc_window, sma_window, exit, start_date, end_date, timeframe='D'):
+    """The stats backtest_single_run prints, without the chart."""
+    data = roc_ma.parseData(file_name, None, end_date, timeframe)
+    stats = roc_ma.backtest_grid_cell(data, roc_window, sma_window, [exit], start_date, end_date)[0]
+
+    return {key: value for key, value in stats.items() if key not in ('roc_window', 'sma_window', 'exit')}
+
+
+@pytest.mark.parametrize('params, chunksize', list(itertools.product(PARAMS, CHUNK_SIZES)))
+def test_daily(daily_csv, params, chunksize):
+    expected = single_run_stats(daily_csv, *params, '1995-01-01', '2000-06-30')
+
+    assert backtest_chunked(daily_csv, *params, '1995-01-01', '2000-06-30', chunksize=chunksize) == expected
+
+
+@pytest.mark.parametrize('params, chunksize, timeframe',
+                         list(itertools.product(PARAMS, CHUNK_SIZES, ['D', '4h'])))
+def test_intraday(hourly_csv, params, chunksize, timeframe):
+    expected = single_run_stats(hourly_csv, *params, '2000-09-01', '2002-06-15 12:00', timeframe)
+    stats = backtest_chunked(hourly_csv, *params, '2000-09-01', '2002-06-15 12:00', chunksize=chunksize,
+                             timeframe=timeframe)
+
+    assert stats == expected
@@ -0,0 +1,37 @@
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting.data import PRICE_COLUMNS, parse_bars, read_bars
+
+
+def write_prices(file_name, layout, n_bars=2_000, seed=0):
+    """Prices with all 17 significant digits, where a parser that is not round-trip exact goes off by one ULP."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2001-01-01', periods=n_bars, freq='D')
+    prices = 100 * np.exp(rng.normal(0, 0.02, (n_bars, len(PRICE_COLUMNS))).cumsum(axis=0))
+
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.writer(f)
+        if layout == 'datetime':
+            writer.writerow(['datetime'] + PRICE_COLUMNS)
+            for date, row in zip(dates, prices):
+                writer.writerow([date.strftime('%Y-%m-%d %H:%M:%S')] + [repr(float(value)) for value in row])
+        else:
+            writer.writerow(['ticker', 'timestamp'] + PRICE_COLUMNS)
+            for date, row in zip(dates, prices):
+                values = [repr(float(value)).replace('.', ',') for value in row]
+                writer.writerow(['X', date.strftime('%y%m%d')] + values)
+
+    return prices
+
+
+@pytest.mark.parametrize('layout', ['datetime', 'timestamp'])
+def test_prices_parse_like_float(tmp_path, layout):
+    file_name = str(tmp_path / 'PRICES.csv')
+    prices = write_prices(file_name, layout)
+
+    assert (parse_bars(file_name, chunksize=300).to_numpy() == prices).all()
+    assert (read_bars(file_name).to_numpy() == prices).all()
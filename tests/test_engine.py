@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import roc_ma
+from backtesting.engine import match_trade_log, match_trades, sell_profits
+
+
+def original_actions(data, exit):
+    """prepare_buy_sell_actions as it was first written, with groupby, to_dict and merge."""
+    data['group'] = (data['signal'] != data['signal'].shift(1)).cumsum()
+
+    grouped_data = data.groupby(['group', 'signal']).agg(
+        timestamp=('date', 'first'),
+        count=('signal', 'size')
+    ).reset_index()
+
+    grouped_data['action'] = pd.NA
+    grouped_data.loc[(grouped_data['count'] > 2) & (grouped_data['signal'] == 1), 'action'] = 'buy'
+    grouped_data.loc[(grouped_data['count'] > exit) & (grouped_data['signal'] == -1), 'action'] = 'sell'
+
+    grouped_data_to_merge = pd.DataFrame(grouped_data.to_dict(orient='records'))
+
+    data = pd.merge(data, grouped_data_to_merge[['timestamp', 'action']], on='timestamp', how='left')
+    data['action'] = data['action'].fillna(-1)
+
+    return data
+
+
+def original_trades(data):
+    """
+    The trades of the original calculate_statistics loop:
+    (row, price, exit row or -1) for every buy and (row, profit) for every closing sell.
+    """
+    buys, sells = [], []
+    is_open_position = False
+
+    for index, row in data.iterrows():
+        if row['action'] == 'buy':
+            buys.append([index, row['close'], -1])
+            is_open_position = True
+        elif row['action'] == 'sell' and is_open_position:
+            profit = 0
+            for buy in buys:
+                if buy[2] == -1:
+                    profit += (row['close'] - buy[1])
+                    buy[2] = index
+            sells.append((index, profit))
+            is_open_position = False
+
+    return buys, sells
+
+
+def signal_frame(signal, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2001-01-01', periods=len(signal), freq='D')
+    close = np.round(100 + rng.normal(0, 1, len(signal)).cumsum(), 2)
+
+    return pd.DataFrame({'timestamp': dates, 'date': dates, 'signal': signal, 'close': close})
+
+
+def assert_matches_original(data, exit):
+    expected = original_actions(data.copy(), exit)
+    actions = roc_ma.prepare_buy_sell_actions(data.set_index('timestamp'), exit)
+    assert actions['action'].tolist() == expected['action'].tolist()
+
+    buys, sells = original_trades(expected)
+    log = match_trade_log(expected['action'] == 'buy', expected['action'] == 'sell', expected['close'])
+
+    assert log['entry_index'].tolist() == [buy[0] for buy in buys]
+    assert log['entry_price'].tolist() == [buy[1] for buy in buys]
+    assert log['exit_index'].tolist() == [buy[2] for buy in buys]
+
+    sell_index, profits = sell_profits(log)
+    assert sell_index.tolist() == [sell[0] for sell in sells]
+    assert profits.tolist() == [sell[1] for sell in sells]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_signals(seed):
+    rng = np.random.default_rng(seed)
+    # long runs, so that both buys and sells happen
+    runs = rng.integers(1, 12, 60)
+    signal = np.repeat(rng.choice([-1, 0, 1], len(runs)), runs)
+
+    assert_matches_original(signal_frame(signal, seed), exit=int(rng.integers(2, 8)))
+
+
+@pytest.mark.parametrize('signal', [
+    # a sell with no buy before it
+    [-1, -1, -1, -1, 1, 1, 1, -1, -1, -1, -1],
+    # a trailing open buy
+    [1, 1, 1, -1, -1, -1, -1, 0, 1, 1, 1],
+    # repeated buy and sell signals: the second sell finds nothing open
+    [1, 1, 1, 0, 1, 1, 1, -1, -1, -1, -1, 0, -1, -1, -1, -1, 1, 1, 1],
+    # no action at all
+    [1, 1, 0, -1, -1, 0, 0],
+])
+# the original fillna warns when no run gets an action
+@pytest.mark.filterwarnings('ignore::FutureWarning')
+def test_edge_cases(signal):
+    assert_matches_original(signal_frame(signal), exit=3)
+
+
+def test_match_trades_counts_only_closing_sells():
+    signal = [-1, -1, -1, -1, 1, 1, 1, -1, -1, -1, -1, 0, -1, -1, -1, -1]
+    data = original_actions(signal_frame(signal), 3)
+    buy_index, sell_index, profits = match_trades(data['action'] == 'buy', data['action'] == 'sell', data['close'])
+
+    assert buy_index.tolist() == [4]
+    assert sell_index.tolist() == [7]
+    assert profits.tolist() == [data['close'][7] - data['close'][4]]
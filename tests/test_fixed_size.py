@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from capital_management.kernels import simulate_fixed_size
+from capital_management.sizing import sizing_sweep
+
+TRADE_SIZES = [10, 50, 100, 300, 1000]
+
+
+def original_profit(data, initial_capital, trade_size):
+    """The simulation of one trade size in fixed_size.main as it was first written, a loop over the rows."""
+    capital = initial_capital
+    trade_capital = trade_size * capital / 100
+
+    profit = 0
+    in_position = False
+    entry_price = None
+
+    for _, row in data.iterrows():
+        signal = row['signal']
+        price = row['close']
+
+        if not in_position:
+            if signal == 1:
+                entry_price = price
+                in_position = True
+        else:
+            if signal == -1:
+                trade_return = (price - entry_price) / entry_price
+                profit = profit + trade_capital * trade_return
+                capital += profit
+                trade_capital = trade_size * capital / 100
+                in_position = False
+
+    if in_position:
+        trade_return = (data.iloc[-1]['close'] - entry_price) / entry_price
+        profit = profit + trade_capital * trade_return
+
+    return profit
+
+
+def roc_signals(seed, n_bars=400, window=10):
+    """Signs of a 10-bar ROC of a random walk, as fixed_size.py builds them (NaN bars dropped)."""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(rng.normal(0, 0.02, n_bars).cumsum()), 2)
+    roc = (close[window:] - close[:-window]) / close[:-window]
+    signal = np.where(roc > 0, 1, np.where(roc < 0, -1, 0))
+
+    return pd.DataFrame({'signal': signal, 'close': close[window:]})
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_kernel_and_sweep_match_the_original_loop(seed):
+    data = roc_signals(seed)
+    signals, prices = data['signal'].to_numpy(), data['close'].to_numpy()
+    expected = [original_profit(data, 1_000_000, trade_size) for trade_size in TRADE_SIZES]
+
+    kernel = [simulate_fixed_size(signals, prices, 1_000_000, trade_size)[1] for trade_size in TRADE_SIZES]
+    sweep, _, _ = sizing_sweep(signals, prices, 1_000_000, trade_sizes=TRADE_SIZES)
+
+    assert kernel == pytest.approx(expected, rel=1e-12)
+    assert sweep['final_profit'].tolist() == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('signal', [[0, 1, 1, -1, 0, 1, 0, 0], [-1, -1, 1, 0, -1, 1, 1, 1], [0, 0, -1, 0, 0, 0, 0, 0]])
+def test_edge_cases(signal):
+    data = pd.DataFrame({'signal': signal, 'close': [10.0, 11.0, 12.5, 12.0, 9.0, 9.5, 10.5, 11.0]})
+
+    profit = simulate_fixed_size(data['signal'].to_numpy(), data['close'].to_numpy(), 1_000, 50)[1]
+    assert profit == pytest.approx(original_profit(data, 1_000, 50), rel=1e-12, abs=1e-12)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from backtesting.indicators import IndicatorCache
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = IndicatorCache(maxsize=100, maxbytes=3 * 800)
+    for key in range(5):
+        cache.get(key, lambda: np.zeros(100))
+
+    # three arrays of 800 bytes fit, the two oldest were evicted
+    assert cache.nbytes == 3 * 800
+    assert cache.get(0, lambda: None) is None
+    assert cache.get(4, lambda: None) is not None
+
+
+def test_value_larger_than_the_cache_is_not_kept():
+    cache = IndicatorCache(maxbytes=800)
+    cache.get('small', lambda: np.zeros(50))
+    cache.get('large', lambda: np.zeros(200))
+
+    assert cache.nbytes == 400
+    assert cache.get('large', lambda: None) is None
+    assert cache.get('small', lambda: None) is not None
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from backtesting import metrics
+
+
+def padded_runs(seed, n_runs=6, max_bars=300):
+    """Random equity curves, profits and positions of different lengths, NaN-padded into 2-D arrays."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(2, max_bars, n_runs)
+
+    equity = np.full((n_runs, max_bars), np.nan)
+    positions = np.full((n_runs, max_bars), np.nan)
+    profits = np.full((n_runs, max_bars), np.nan)
+    for run, length in enumerate(lengths):
+        equity[run, :length] = 100 * np.exp(rng.normal(0, 0.02, length).cumsum())
+        positions[run, :length] = rng.integers(0, 2, length)
+        profits[run, :length] = rng.normal(0, 1, length)
+
+    return lengths, equity, profits, positions
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_padding_is_ignored(seed):
+    lengths, equity, profits, positions = padded_runs(seed)
+    batch = metrics.performance(equity, profits, positions)
+
+    for run, length in enumerate(lengths):
+        single = metrics.performance(equity[run, :length], profits[run, :length], positions[run, :length])
+        assert batch.iloc[run].to_dict() == pytest.approx(single, rel=1e-12)
+
+
+def test_padded_curve():
+    stats = metrics.performance(np.array([[100, 120, 110, np.nan, np.nan]]))
+
+    assert stats['total_return'][0] == pytest.approx(0.1)
+    assert stats['max_drawdown_duration'][0] == 1
+    assert stats['cagr'][0] == pytest.approx(metrics.cagr(np.array([100, 120, 110])))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import roc_ma
+
+
+def original_statistics(data):
+    """calculate_statistics as it was first written, a loop over the rows with a list of trade dicts."""
+    trades = []
+    total_profit = 0
+    is_open_position = False
+
+    for index, row in data.iterrows():
+        if row['action'] == 'buy':
+            trades.append({'action': 'buy', 'price': row['close'], 'status': 'OPEN'})
+            is_open_position = True
+        elif row['action'] == 'sell' and is_open_position:
+            sell_price = row['close']
+
+            profit = 0
+            for trade in trades:
+                if trade['status'] == 'OPEN':
+                    profit += (sell_price - trade['price'])
+                    trade['status'] = 'CLOSED'
+
+            trades.append({'action': 'sell', 'price': sell_price, 'profit': profit, 'status': 'CLOSED_ALL'})
+            total_profit += profit
+            is_open_position = False
+
+    buy_orders = [trade for trade in trades if trade['action'] == 'buy']
+    sell_orders = [trade for trade in trades if trade['action'] == 'sell']
+    win_trades = [trade for trade in trades if 'profit' in trade and trade['profit'] > 0]
+    loss_trades = [trade for trade in trades if 'profit' in trade and trade['profit'] <= 0]
+
+    win_loss_ration = len(win_trades) / len(loss_trades) if loss_trades else 0
+
+    return {
+        'total_profit': total_profit,
+        'total_trades': len(buy_orders + sell_orders),
+        'win_rate': (len(win_trades) / len(win_trades + loss_trades)) * 100,
+        'win_loss_ratio': format(win_loss_ration, ".2f"),
+        'average_profit': total_profit / len([trade for trade in trades if 'profit' in trade]),
+        'wins': len(win_trades),
+        'losses': len(loss_trades),
+        'buy_orders': len(buy_orders),
+        'sell_orders': len(sell_orders),
+    }
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_original_loop_on_random_actions(seed):
+    rng = np.random.default_rng(seed)
+    n_bars = int(rng.integers(50, 400))
+    data = pd.DataFrame({
+        'action': rng.choice(np.array(['buy', 'sell', -1], dtype=object), n_bars, p=[0.1, 0.1, 0.8]),
+        'close': np.round(100 + rng.normal(0, 5, n_bars).cumsum(), 2),
+    })
+    # at least one closed trade, the stats are undefined without one
+    data.loc[0, 'action'], data.loc[n_bars - 1, 'action'] = 'buy', 'sell'
+
+    assert roc_ma.calculate_statistics(data) == original_statistics(data)
+
+
+def test_matches_original_loop_on_a_backtest(daily_csv):
+    data = roc_ma.get_smoothed_roc_indicator(roc_ma.parseData(daily_csv, None, None), 10, 20)
+    data = roc_ma.prepare_buy_sell_actions(roc_ma.prepare_buy_sell_signals(data.loc['1995-01-01':]), 5)
+
+    assert roc_ma.calculate_statistics(data) == original_statistics(data)
+
+
+def test_no_closed_trade_raises_like_the_original():
+    data = pd.DataFrame({'action': np.array(['sell', 'buy', -1], dtype=object), 'close': [1.0, 2.0, 3.0]})
+
+    with pytest.raises(ZeroDivisionError):
+        original_statistics(data)
+    with pytest.raises(ZeroDivisionError):
+        roc_ma.calculate_statistics(data)
@@ -0,0 +1,23 @@
+import pytest
+
+import roc_ma
+from backtesting.streaming import StreamingROCStrategy, replay_csv
+
+
+@pytest.mark.parametrize('roc_window, sma_window, exit', [(10, 20, 5), (21, 100, 10)])
+@pytest.mark.parametrize('timeframe', ['D', '4h'])
+def test_replay_matches_batch_actions(hourly_csv, roc_window, sma_window, exit, timeframe):
+    start_date, end_date = '2000-09-01', '2002-06-15'
+
+    data = roc_ma.get_smoothed_roc_indicator(roc_ma.parseData(hourly_csv, None, end_date, timeframe),
+                                             roc_window, sma_window)
+    data = roc_ma.prepare_buy_sell_actions(roc_ma.prepare_buy_sell_signals(data.loc[start_date:end_date]), exit)
+    expected = data[data['action'] != -1]
+
+    events = replay_csv(hourly_csv, StreamingROCStrategy(roc_window, sma_window, exit), start_date, end_date,
+                        timeframe)
+
+    assert len(events) == len(expected) > 0
+    assert (events['timestamp'].to_numpy() == expected['timestamp'].to_numpy()).all()
+    assert (events['close'].to_numpy() == expected['close'].to_numpy()).all()
+    assert (events['action'].to_numpy() == expected['action'].to_numpy()).all()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import roc_ma
+from backtesting.benchmark import synthetic_ohlcv, write_csv
+from backtesting.universe import backtest_universe, load_universe, roc_signals, run_policy
+from capital_management.kernels import simulate_anti_martingale, simulate_fixed_size
+
+START, END = '1991-01-01', '1995-06-30'
+
+
+@pytest.fixture(scope='module')
+def universe(tmp_path_factory):
+    """Two symbols: A trades every day, B is listed later and has a 30-bar gap."""
+    directory = tmp_path_factory.mktemp('universe')
+    late_listing = synthetic_ohlcv(2_000, seed=4)
+    write_csv(synthetic_ohlcv(2_000, seed=3), str(directory / 'A.csv'))
+    write_csv(late_listing.drop(late_listing.index[800:830]).iloc[100:], str(directory / 'B.csv'))
+
+    return str(directory)
+
+
+@pytest.mark.parametrize('roc_window, sma_window, exit', [(10, 20, 5), (21, 100, 10)])
+def test_symbol_stats_match_its_own_file(universe, roc_window, sma_window, exit):
+    stats, _ = backtest_universe(universe, roc_window, sma_window, exit, START, END)
+
+    for symbol in ('A', 'B'):
+        data = roc_ma.parseData(f'{universe}/{symbol}.csv', None, END)
+        expected = roc_ma.backtest_grid_cell(data, roc_window, sma_window, [exit], START, END)[0]
+        assert {key: stats.loc[symbol][key] for key in stats.columns} == \
+               {key: value for key, value in expected.items() if key in stats.columns}
+
+
+def test_symbol_without_closed_trade(universe):
+    stats, _ = backtest_universe(universe, 10, 20, 30, '1991-01-01', '1991-01-21')
+
+    assert (stats['losses'] == 0).all() and (stats['wins'] == 0).all()
+    assert stats['win_rate'].isna().all() and stats['average_profit'].isna().all()
+
+
+@pytest.mark.parametrize('simulate, params', [(simulate_fixed_size, {'trade_size': 20}),
+                                              (simulate_anti_martingale, {'base_trade_size': 10_000})])
+def test_policy_runs_on_the_own_bars_of_every_symbol(universe, simulate, params):
+    history = load_universe(universe)
+    signals = roc_signals(history['close'], 10, 1, history.has_bar)
+    window = history.dates.slice_indexer(START, END)
+    panel = history.slice(START, END)
+
+    logs, equity = run_policy(panel, signals[window], simulate, 1_000_000, **params)
+
+    for i, symbol in enumerate(panel.symbols):
+        dates = np.flatnonzero(panel.has_bar[:, i])
+        trades, _ = simulate(signals[window][dates, i], panel['close'][dates, i], 500_000, **params)
+        assert (logs[symbol]['capital'] == trades['capital']).all()
+        assert (panel['close'][logs[symbol]['entry_index'], i] == trades['entry_price']).all()
+
+    assert equity.iloc[0] == 1_000_000
+    assert equity.iloc[-1] == pytest.approx(sum(log.closed()['capital'][-1] for log in logs.values()))
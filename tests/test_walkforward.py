@@ -0,0 +1,15 @@
+import pytest
+
+import roc_ma
+from backtesting.walkforward import _cell_stats
+
+
+def test_exit_without_closed_trade_keeps_the_others(daily_csv):
+    data = roc_ma.parseData(daily_csv, None, None)
+
+    # exit=20 never closes a trade in this window, exit=5 does
+    with pytest.raises(ZeroDivisionError):
+        roc_ma.backtest_grid_cell(data, 10, 100, [5, 20], '1993-07-01', '1993-12-01')
+
+    stats = _cell_stats(data, 10, 100, [5, 20], '1993-07-01', '1993-12-01', None)
+    assert stats == roc_ma.backtest_grid_cell(data, 10, 100, [5], '1993-07-01', '1993-12-01')